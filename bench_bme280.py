@@ -0,0 +1,202 @@
+"""
+Cross-variant benchmark: runs bme280.py, bme280_lowmem.py, bme280_microbit.py
+and bme280_microbit_lowmem.py against bme280_sim on a virtual clock and
+reports, per variant:
+
+    construct_us          simulated time to construct the driver
+    construct_i2c         I2C transactions during construction
+    sample_us             simulated latency of read_compensated_data
+    samples_per_s         1e6 / sample_us
+    sample_i2c            I2C transactions per sample
+    sample_bytes          I2C payload bytes per sample
+    compensation_cpu_us   host CPU time of the compensation step
+    read_cpu_us           host CPU time of a whole read (sleeps excluded)
+    alloc_peak_bytes      peak traced allocation during one read
+
+    python bench_bme280.py --json results.json
+    python bench_bme280.py --baseline bench_baseline.json
+    python bench_bme280.py --save-baseline bench_baseline.json
+
+With --baseline the exit status is 1 when a metric regresses. Simulated
+and I2C metrics must not grow and allocation may grow by --tolerance
+(relative). Host CPU figures swing with machine load, so CPU growth beyond
+--tolerance is only reported unless --strict is given.
+"""
+
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+
+import bme280_sim
+
+VARIANTS = ("bme280", "bme280_lowmem", "bme280_microbit",
+            "bme280_microbit_lowmem")
+EXACT_METRICS = ("construct_us", "construct_i2c", "sample_us",
+                 "sample_i2c", "sample_bytes")
+CPU_METRICS = ("compensation_cpu_us", "read_cpu_us")
+HIGHER_IS_BETTER = ("samples_per_s",)
+
+
+def _raw_reader(name, driver):
+    if name.startswith("bme280_microbit"):
+        return driver.read_raw_data
+    buf = driver._l3_resultarray
+    return lambda: driver.read_raw_data(buf)
+
+
+def _cpu_per_call(function, count, repeat=5):
+    best = None
+    for _ in range(repeat):
+        start = time.process_time()
+        for _ in range(count):
+            function()
+        elapsed = time.process_time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best * 1000000 / count
+
+
+def _cheap_conversions(sensor):
+    # Keep the simulator's ADC inversion out of the driver CPU figures
+    sensor.environment = bme280_sim.constant()
+    invert = sensor.raw_from_environment
+    cache = {}
+
+    def raw_from_environment(temperature, pressure, humidity):
+        key = (temperature, pressure, humidity)
+        if key not in cache:
+            cache[key] = invert(temperature, pressure, humidity)
+        return cache[key]
+    sensor.raw_from_environment = raw_from_environment
+
+
+def bench_variant(name, samples):
+    # A fresh clock per variant keeps its figures independent of the others
+    clock = bme280_sim.VirtualClock()
+    bme280_sim.install(clock)
+    sensor = bme280_sim.SimulatedBME280(
+        clock=clock, environment=bme280_sim.sine(21.0, 2.0, 60.0))
+    i2c = bme280_sim.SimI2C(sensor)
+
+    start = clock()
+    driver = bme280_sim.driver(name, i2c)
+    construct_us = (clock() - start) * 1000000
+    construct_i2c = i2c.transactions
+
+    # Let the adaptive wait settle before measuring
+    for _ in range(16):
+        driver.read_compensated_data()
+
+    i2c.reset_counters()
+    start = clock()
+    for _ in range(samples):
+        driver.read_compensated_data()
+    sample_us = (clock() - start) * 1000000 / samples
+    sample_i2c = i2c.transactions / samples
+    sample_bytes = (i2c.bytes_read + i2c.bytes_written) / samples
+
+    _cheap_conversions(sensor)
+    read_raw = _raw_reader(name, driver)
+    raw_cpu = _cpu_per_call(read_raw, samples)
+    read_cpu = _cpu_per_call(driver.read_compensated_data, samples)
+
+    tracemalloc.start()
+    driver.read_compensated_data()
+    tracemalloc.reset_peak()
+    before = tracemalloc.get_traced_memory()[0]
+    driver.read_compensated_data()
+    alloc_peak = tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+
+    return {
+        "construct_us": round(construct_us, 1),
+        "construct_i2c": construct_i2c,
+        "sample_us": round(sample_us, 1),
+        "samples_per_s": round(1000000 / sample_us, 2),
+        "sample_i2c": round(sample_i2c, 2),
+        "sample_bytes": round(sample_bytes, 2),
+        "compensation_cpu_us": round(max(read_cpu - raw_cpu, 0.0), 2),
+        "read_cpu_us": round(read_cpu, 2),
+        "alloc_peak_bytes": alloc_peak,
+    }
+
+
+def run(samples=200, variants=VARIANTS):
+    try:
+        return dict((name, bench_variant(name, samples))
+                    for name in variants)
+    finally:
+        bme280_sim.uninstall()
+
+
+def compare(results, baseline, tolerance, strict=False):
+    """
+    Regressions of results against baseline as (fatal, message) pairs;
+    CPU regressions are only fatal when strict.
+    """
+    regressions = []
+    for name, metrics in sorted(baseline.items()):
+        current = results.get(name)
+        if current is None:
+            continue
+        for metric, old in sorted(metrics.items()):
+            new = current.get(metric)
+            if new is None:
+                continue
+            if metric in HIGHER_IS_BETTER:
+                worse = new < old * (1 - 1e-4)
+            elif metric in EXACT_METRICS:
+                # allow for microsecond rounding of the virtual clock
+                worse = new > old * (1 + 1e-4)
+            else:
+                worse = new > old * (1 + tolerance) + 1
+            if worse:
+                fatal = strict or metric not in CPU_METRICS
+                regressions.append((fatal, "{} {}: {} -> {}".format(
+                    name, metric, old, new)))
+    return regressions
+
+
+def _print_table(results):
+    metrics = list(next(iter(results.values())))
+    width = max(len(name) for name in results)
+    print(" " * width + "".join("{:>21}".format(m) for m in metrics))
+    for name, values in results.items():
+        print(name.ljust(width) +
+              "".join("{:>21}".format(values[m]) for m in metrics))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="compare against this file")
+    parser.add_argument("--save-baseline", help="write results as baseline")
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="allowed relative growth of CPU/heap metrics")
+    parser.add_argument("--strict", action="store_true",
+                        help="fail on CPU time regressions too")
+    args = parser.parse_args(argv)
+
+    results = run(args.samples)
+    _print_table(results)
+    for path in (args.json, args.save_baseline):
+        if path:
+            with open(path, "w") as f:
+                json.dump(results, f, indent=2, sort_keys=True)
+                f.write("\n")
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance,
+                                  args.strict)
+        for fatal, line in regressions:
+            print(("REGRESSION " if fatal else "NOTE ") + line)
+        if any(fatal for fatal, _ in regressions):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
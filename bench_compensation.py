@@ -0,0 +1,98 @@
+"""
+Times bme280.compensate() against the per-attribute compensation of
+bme280.py 3.1.2. Run with `micropython bench_compensation.py`.
+"""
+from array import array
+import bme280
+from test_compensation import CALIBRATION, GOLDEN
+
+try:
+    from time import ticks_us, ticks_diff
+except ImportError:
+    from time import perf_counter
+
+    def ticks_us():
+        return int(perf_counter() * 1000000)
+
+    def ticks_diff(end, start):
+        return end - start
+
+ROUNDS = 200
+
+
+class Legacy(object):
+    """ Compensation as done by bme280.BME280 3.1.2, one attribute at a time """
+
+    def __init__(self, cal):
+        self.dig_T1, self.dig_T2, self.dig_T3, \
+            self.dig_P1, self.dig_P2, self.dig_P3, self.dig_P4, \
+            self.dig_P5, self.dig_P6, self.dig_P7, self.dig_P8, \
+            self.dig_P9, self.dig_H1, self.dig_H2, self.dig_H3, \
+            self.dig_H4, self.dig_H5, self.dig_H6 = cal
+        self.t_fine = 0
+
+    def compensate(self, raw_temp, raw_press, raw_hum, result):
+        var1 = ((raw_temp >> 3) - (self.dig_T1 << 1)) * (self.dig_T2 >> 11)
+        var2 = (raw_temp >> 4) - self.dig_T1
+        var2 = var2 * ((raw_temp >> 4) - self.dig_T1)
+        var2 = ((var2 >> 12) * self.dig_T3) >> 14
+        self.t_fine = var1 + var2
+        temp = (self.t_fine * 5 + 128) >> 8
+        var1 = self.t_fine - 128000
+        var2 = var1 * var1 * self.dig_P6
+        var2 = var2 + ((var1 * self.dig_P5) << 17)
+        var2 = var2 + (self.dig_P4 << 35)
+        var1 = (((var1 * var1 * self.dig_P3) >> 8) +
+                ((var1 * self.dig_P2) << 12))
+        var1 = (((1 << 47) + var1) * self.dig_P1) >> 33
+        if var1 == 0:
+            pressure = 0
+        else:
+            p = 1048576 - raw_press
+            p = (((p << 31) - var2) * 3125) // var1
+            var1 = (self.dig_P9 * (p >> 13) * (p >> 13)) >> 25
+            var2 = (self.dig_P8 * p) >> 19
+            pressure = ((p + var1 + var2) >> 8) + (self.dig_P7 << 4)
+        h = self.t_fine - 76800
+        h = (((((raw_hum << 14) - (self.dig_H4 << 20) -
+                (self.dig_H5 * h)) + 16384)
+              >> 15) * (((((((h * self.dig_H6) >> 10) *
+                            (((h * self.dig_H3) >> 11) + 32768)) >> 10) +
+                          2097152) * self.dig_H2 + 8192) >> 14))
+        h = h - (((((h >> 15) * (h >> 15)) >> 7) * self.dig_H1) >> 4)
+        h = 0 if h < 0 else h
+        h = 419430400 if h > 419430400 else h
+        result[0] = temp
+        result[1] = pressure
+        result[2] = h >> 12
+
+
+def bench(name, kernel, cal=None):
+    result = array("i", [0, 0, 0])
+    start = ticks_us()
+    if cal is None:
+        for _ in range(ROUNDS):
+            for raw, _ in GOLDEN:
+                kernel(raw[0], raw[1], raw[2], result)
+    else:
+        for _ in range(ROUNDS):
+            for raw, _ in GOLDEN:
+                kernel(cal, raw[0], raw[1], raw[2], result)
+    elapsed = ticks_diff(ticks_us(), start)
+    per_sample = elapsed / (ROUNDS * len(GOLDEN))
+    print("{}: {:.2f} us/sample".format(name, per_sample))
+    return per_sample
+
+
+legacy = Legacy(CALIBRATION)
+cal = bme280.calibration_table(*CALIBRATION)
+result = array("i", [0, 0, 0])
+for raw, expected in GOLDEN:
+    legacy.compensate(raw[0], raw[1], raw[2], result)
+    assert tuple(result) == expected
+
+base = bench("3.1.2 attributes", legacy.compensate)
+for name, kernel in (("compensate", bme280.compensate),
+                     ("compensate (active)", bme280._compensate)):
+    t = bench(name, kernel, cal)
+    print("  speedup x{:.2f}".format(base / t))
@@ -0,0 +1,84 @@
+"""
+Import time and heap cost of each driver build. On a board copy the .py or
+build/*.mpy files next to this script and run it; it prints, per module,
+the microseconds and heap bytes taken by the import and by constructing a
+sensor on the I2C bus given to run(). Under CPython the sensor is
+bme280_sim and heap is measured with tracemalloc.
+
+    import bench_import
+    bench_import.run(i2c)
+"""
+
+import gc
+import sys
+
+try:
+    from time import ticks_us, ticks_diff
+except ImportError:
+    from time import perf_counter
+
+    def ticks_us():
+        return int(perf_counter() * 1000000)
+
+    def ticks_diff(end, start):
+        return end - start
+
+try:
+    mem_alloc = gc.mem_alloc
+except AttributeError:
+    import tracemalloc
+
+    def mem_alloc():
+        return tracemalloc.get_traced_memory()[0]
+
+    tracemalloc.start()
+
+MODULES = ("bme280", "bme280_lowmem", "bme280_microbit",
+           "bme280_microbit_lowmem")
+
+
+def measure(name, i2c, construct=None):
+    """
+    (import_us, import_bytes, construct_bytes) of one module. The sensor is
+    BME280(i2c=i2c) at the module's default address, or construct(name, i2c)
+    """
+    sys.modules.pop(name, None)
+    gc.collect()
+    before = mem_alloc()
+    start = ticks_us()
+    module = __import__(name)
+    import_us = ticks_diff(ticks_us(), start)
+    gc.collect()
+    imported = mem_alloc()
+    if construct is None:
+        sensor = module.BME280(i2c=i2c)
+    else:
+        sensor = construct(name, i2c)
+    gc.collect()
+    constructed = mem_alloc()
+    del sensor
+    return import_us, imported - before, constructed - imported
+
+
+def run(i2c, modules=MODULES, construct=None):
+    print("{:<24}{:>11}{:>14}{:>17}".format(
+        "module", "import_us", "import_bytes", "construct_bytes"))
+    for name in modules:
+        try:
+            import_us, import_bytes, construct_bytes = measure(name, i2c,
+                                                           construct)
+        except ImportError:
+            # micro:bit builds need the microbit module
+            continue
+        print("{:<24}{:>11}{:>14}{:>17}".format(
+            name, import_us, import_bytes, construct_bytes))
+
+
+if __name__ == "__main__":
+    if sys.implementation.name == "micropython":
+        print("call bench_import.run(i2c) with the board's I2C bus")
+    else:
+        import bme280_sim
+        bme280_sim.install()
+        run(bme280_sim.SimI2C(bme280_sim.SimulatedBME280()),
+            construct=bme280_sim.driver)
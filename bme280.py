@@ -7,35 +7,211 @@ License: MIT License (https://opensource.org/licenses/MIT)
 """
 
 import time
-from ustruct import unpack, unpack_from
+try:
+    from ustruct import unpack, unpack_from
+except ImportError:
+    from struct import unpack, unpack_from
 from array import array
+try:
+    from micropython import const
+except ImportError:
+    def const(value):
+        return value
 
 # BME280 default address
-BME280_I2CADDR = 0x76
+BME280_I2CADDR = const(0x76)
 # BME280_I2CADDR = 0x77
 
-OSAMPLE_0 = 0
-OSAMPLE_1 = 1
-OSAMPLE_2 = 2
-OSAMPLE_4 = 3
-OSAMPLE_8 = 4
-OSAMPLE_16 = 5
+OSAMPLE_0 = const(0)
+OSAMPLE_1 = const(1)
+OSAMPLE_2 = const(2)
+OSAMPLE_4 = const(3)
+OSAMPLE_8 = const(4)
+OSAMPLE_16 = const(5)
 
-BME280_REGISTER_STATUS = 0xF3
-BME280_REGISTER_CONTROL_HUM = 0xF2
-BME280_REGISTER_CONTROL = 0xF4
-BME280_REGISTER_CONTROL_IIR = 0xF5
+BME280_REGISTER_STATUS = const(0xF3)
+BME280_REGISTER_CONTROL_HUM = const(0xF2)
+BME280_REGISTER_CONTROL = const(0xF4)
+BME280_REGISTER_CONTROL_IIR = const(0xF5)
 
-FILTER_OFF = 0
-FILTER_2 = 1
-FILTER_4 = 2
-FILTER_8 = 3
-FILTER_16 = 4
+MODE_SLEEP = const(0)
+MODE_FORCED = const(1)
+MODE_NORMAL = const(3)
+
+STANDBY_0_5 = const(0)
+STANDBY_62_5 = const(1)
+STANDBY_125 = const(2)
+STANDBY_250 = const(3)
+STANDBY_500 = const(4)
+STANDBY_1000 = const(5)
+STANDBY_10 = const(6)
+STANDBY_20 = const(7)
+
+FILTER_OFF = const(0)
+FILTER_2 = const(1)
+FILTER_4 = const(2)
+FILTER_8 = const(3)
+FILTER_16 = const(4)
 
 CELSIUS = 'C'
 FAHRENHEIT = 'F'
 KELVIN = 'K'
 
+# Channels measured, see BME280.set_channels()
+CHANNEL_TEMPERATURE = const(1)
+CHANNEL_PRESSURE = const(2)
+CHANNEL_HUMIDITY = const(4)
+CHANNELS_ALL = const(7)
+
+_REGISTER_DATA = const(0xF7)
+_REGISTER_TEMPERATURE_DATA = const(0xFA)
+_STATUS_MEASURING = const(0x08)
+
+
+def calibration_table(t1, t2, t3, p1, p2, p3, p4, p5, p6, p7, p8, p9,
+                      h1, h2, h3, h4, h5, h6):
+    """
+    Fold the calibration-only terms of the Bosch integer compensation into
+    the tuple consumed by compensate().
+    """
+    return (t1, t1 << 1, t2 >> 11, t3,
+            p1, p1 << 14, p2 << 12, p3, p4 << 35, p5 << 17, p6, p7 << 4,
+            p8, p9,
+            h1, h2, h3, h4 << 20, h5, h6)
+
+
+def compensate(cal, raw_temp, raw_press, raw_hum, result,
+               channels=CHANNELS_ALL):
+    """
+    Compensate one raw sample with a calibration_table() tuple. Fills
+    result with (temperature, pressure, humidity) and returns t_fine.
+    Channels missing from the CHANNEL_* mask are left at 0.
+    """
+    t1, t1_x2, t2_11, t3, \
+        p1, p1_14, p2_12, p3, p4_35, p5_17, p6, p7_4, p8, p9, \
+        h1, h2, h3, h4_20, h5, h6 = cal
+
+    var2 = (raw_temp >> 4) - t1
+    t_fine = (((raw_temp >> 3) - t1_x2) * t2_11 +
+              ((((var2 * var2) >> 12) * t3) >> 14))
+    result[0] = (t_fine * 5 + 128) >> 8
+
+    if channels & CHANNEL_PRESSURE:
+        var1 = t_fine - 128000
+        var2 = var1 * var1 * p6 + var1 * p5_17 + p4_35
+        var1 = ((var1 * var1 * p3) >> 8) + var1 * p2_12
+        # Same as (((1 << 47) + var1) * dig_P1) >> 33 and
+        # (((p << 31) - var2) * 3125) // var1, split so no intermediate
+        # leaves the small int range of 64-bit ports
+        var1 = p1_14 + ((var1 * p1) >> 33)
+        if var1 == 0:
+            result[1] = 0
+        else:
+            # no divmod: its result tuple is a heap allocation per read
+            x = ((1048576 - raw_press) << 31) - var2
+            p = x // var1
+            p = p * 3125 + ((x - p * var1) * 3125) // var1
+            result[1] = (((p + ((p9 * (p >> 13) * (p >> 13)) >> 25) +
+                           ((p8 * p) >> 19)) >> 8) + p7_4)
+    else:
+        result[1] = 0
+
+    if channels & CHANNEL_HUMIDITY:
+        h = t_fine - 76800
+        h = (((((raw_hum << 14) - h4_20 - (h5 * h)) + 16384) >> 15) *
+             (((((((h * h6) >> 10) * (((h * h3) >> 11) + 32768)) >> 10) +
+                2097152) * h2 + 8192) >> 14))
+        h = h - (((((h >> 15) * (h >> 15)) >> 7) * h1) >> 4)
+        if h < 0:
+            h = 0
+        elif h > 419430400:
+            h = 419430400
+        result[2] = h >> 12
+    else:
+        result[2] = 0
+    return t_fine
+
+
+def measurement_time(temperature_mode, pressure_mode, humidity_mode):
+    """
+    Typical and maximum measurement time in us for the OSAMPLE_* settings
+    (datasheet appendix B)
+    """
+    t_typ = 1000
+    t_max = 1250
+    if temperature_mode != OSAMPLE_0:
+        t_typ += 2000 << (temperature_mode - 1)
+        t_max += 2300 << (temperature_mode - 1)
+    if pressure_mode != OSAMPLE_0:
+        t_typ += 500 + (2000 << (pressure_mode - 1))
+        t_max += 575 + (2300 << (pressure_mode - 1))
+    if humidity_mode != OSAMPLE_0:
+        t_typ += 500 + (2000 << (humidity_mode - 1))
+        t_max += 575 + (2300 << (humidity_mode - 1))
+    return t_typ, t_max
+
+
+def learn_wait(t_wait, t_typ, t_max, elapsed, polls):
+    """
+    Next wait in us before polling a forced conversion: towards the elapsed
+    time when the status had to be polled, creeping down when the first
+    poll found the conversion done; kept within 3/4 t_typ and t_max
+    """
+    if polls:
+        t_wait += (elapsed - t_wait) >> 2
+    else:
+        t_wait -= t_wait >> 5
+    if t_wait < (t_typ * 3) >> 2:
+        return (t_typ * 3) >> 2
+    if t_wait > t_max:
+        return t_max
+    return t_wait
+
+
+def parse_readout(readout, base, channels, result):
+    """
+    Fill result with the raw temperature, pressure and humidity words of a
+    data register burst read, where readout[base] is register 0xF7 (base is
+    -3 for a read from 0xFA). Channels missing from the CHANNEL_* mask get
+    the chip's skip values.
+    """
+    result[0] = ((readout[base + 3] << 16) | (readout[base + 4] << 8) |
+                 readout[base + 5]) >> 4
+    if channels & CHANNEL_PRESSURE:
+        result[1] = ((readout[base] << 16) | (readout[base + 1] << 8) |
+                     readout[base + 2]) >> 4
+    else:
+        result[1] = 0x80000
+    if channels & CHANNEL_HUMIDITY:
+        result[2] = (readout[base + 6] << 8) | readout[base + 7]
+    else:
+        result[2] = 0x8000
+
+
+try:
+    # Same kernel compiled by the native emitter, where the port has one
+    from bme280_native import compensate as _compensate
+except (ImportError, SyntaxError):
+    _compensate = compensate
+
+
+class I2CBus(object):
+    """
+    Register access over I2C. Other transports (see bme280_bus) provide the
+    same read_into/write methods.
+    """
+
+    def __init__(self, i2c, address=BME280_I2CADDR):
+        self.i2c = i2c
+        self.address = address
+
+    def read_into(self, register, buf):
+        self.i2c.readfrom_mem_into(self.address, register, buf)
+
+    def write(self, register, buf):
+        self.i2c.writeto_mem(self.address, register, buf)
+
+
 class BME280(object):
 
     def __init__(self,
@@ -45,17 +221,16 @@ class BME280(object):
                  temperature_scale=CELSIUS,
                  iir=FILTER_16,
                  address=BME280_I2CADDR,
-                 i2c=None):
+                 i2c=None,
+                 mode=MODE_FORCED,
+                 standby=STANDBY_0_5,
+                 max_age=0,
+                 bus=None,
+                 cache=None):
 
-        osamples = [
-            OSAMPLE_0,
-            OSAMPLE_1,
-            OSAMPLE_2,
-            OSAMPLE_4,
-            OSAMPLE_8,
-            OSAMPLE_16]
+        osamples = range(OSAMPLE_0, OSAMPLE_16 + 1)
 
-        msg_error = 'Unexpected {} operating mode value {0}.'
+        msg_error = 'Unexpected {0} operating mode value {1}.'
         if temperature_mode not in osamples:
             raise ValueError(msg_error.format("temperature", temperature_mode))
         self.temperature_mode = temperature_mode
@@ -66,157 +241,383 @@ class BME280(object):
             raise ValueError(msg_error.format("humidity", humidity_mode))
         self.humidity_mode = humidity_mode
         msg_error = 'Unexpected low pass IIR filter setting value {0}.'
-        if iir not in [FILTER_OFF, FILTER_2, FILTER_4, FILTER_8, FILTER_16]:
+        if iir not in range(FILTER_OFF, FILTER_16 + 1):
             raise ValueError(msg_error.format(iir))
         self.iir = iir
         msg_error = 'Unexpected temperature scale value {0}.'
-        if temperature_scale not in [CELSIUS, FAHRENHEIT, KELVIN]:
+        if temperature_scale not in (CELSIUS, FAHRENHEIT, KELVIN):
             raise ValueError(msg_error.format(temperature_scale))
         self.temperature_scale = temperature_scale
+        msg_error = 'Unexpected standby time setting value {0}.'
+        if standby not in range(STANDBY_0_5, STANDBY_20 + 1):
+            raise ValueError(msg_error.format(standby))
+        self.standby = standby
+        msg_error = 'Unexpected power mode value {0}.'
+        if mode not in (MODE_SLEEP, MODE_FORCED, MODE_NORMAL):
+            raise ValueError(msg_error.format(mode))
         del msg_error
         self.address = address
-        if i2c is None:
-            raise ValueError('An I2C object is required.')
+        if bus is None:
+            if i2c is None:
+                raise ValueError('An I2C or bus object is required.')
+            bus = I2CBus(i2c, address)
         self.i2c = i2c
-        dig_88_a1 = self.i2c.readfrom_mem(self.address, 0x88, 26)
-        dig_e1_e7 = self.i2c.readfrom_mem(self.address, 0xE1, 7)
-        self.dig_T1, self.dig_T2, self.dig_T3, self.dig_P1, \
-            self.dig_P2, self.dig_P3, self.dig_P4, self.dig_P5, \
-            self.dig_P6, self.dig_P7, self.dig_P8, self.dig_P9, \
-            _, self.dig_H1 = unpack("<HhhHhhhhhhhhBB", dig_88_a1)
-        self.dig_H2, self.dig_H3 = unpack("<hB", dig_e1_e7)
-        e4_sign = unpack_from("<b", dig_e1_e7, 3)[0]
-        self.dig_H4 = (e4_sign << 4) | (dig_e1_e7[4] & 0xF)
-        e6_sign = unpack_from("<b", dig_e1_e7, 5)[0]
-        self.dig_H5 = (e6_sign << 4) | (dig_e1_e7[4] >> 4)
-        self.dig_H6 = unpack_from("<b", dig_e1_e7, 6)[0]
-        self.i2c.writeto_mem(
-            self.address,
-            BME280_REGISTER_CONTROL,
-            bytearray([0x24]))
-        time.sleep(0.002)
+        self.bus = bus
+        # Bound once: saves an attribute lookup per transaction
+        self._bus_read_into = bus.read_into
+        self._bus_write = bus.write
         self.t_fine = 0
         self._l1_barray = bytearray(1)
         self._l8_barray = bytearray(8)
         self._l3_resultarray = array("i", [0, 0, 0])
-        self._l1_barray[0] = self.iir << 2
-        self.i2c.writeto_mem(
-            self.address,
-            BME280_REGISTER_CONTROL_IIR,
-            self._l1_barray)
-        time.sleep(0.002)
-        self._l1_barray[0] = self.humidity_mode
-        self.i2c.writeto_mem(
-            self.address,
-            BME280_REGISTER_CONTROL_HUM,
-            self._l1_barray)
+        # Oversampling that set_channels() gives back to pressure, humidity
+        self._resume = bytearray((OSAMPLE_1, OSAMPLE_1))
+        self.max_age = max_age
+        self._snapshot = array("i", [0, 0, 0])
+        self._snapshot_ticks = None
+        self.stats = None
+        # Sea level pressure in Pa for altitude(), see calibrate_altitude()
+        self.sea_level = 101325
+        self._update_timing()
+        # Shadow of ctrl_hum, status, ctrl_meas and config (0xF2..0xF5),
+        # seeded from the chip so only differing registers get written
+        self._shadow = bytearray(4)
+        self._trigger = bytearray(1)
+        if cache is None or not self._restore(cache):
+            self._read_calibration()
+        self._bus_read_into(BME280_REGISTER_CONTROL_HUM, self._shadow)
+        self.mode = mode
+        self._configure()
+
+    def _read_calibration(self):
+        dig_88_a1 = bytearray(26)
+        dig_e1_e7 = bytearray(7)
+        self._bus_read_into(0x88, dig_88_a1)
+        self._bus_read_into(0xE1, dig_e1_e7)
+        dig = unpack("<HhhHhhhhhhhhBB", dig_88_a1)
+        dig_h2, dig_h3 = unpack_from("<hB", dig_e1_e7)
+        e4_sign = unpack_from("<b", dig_e1_e7, 3)[0]
+        e6_sign = unpack_from("<b", dig_e1_e7, 5)[0]
+        self._set_calibration(
+            dig[:12] + (dig[13], dig_h2, dig_h3,
+                        (e4_sign << 4) | (dig_e1_e7[4] & 0xF),
+                        (e6_sign << 4) | (dig_e1_e7[4] >> 4),
+                        unpack_from("<b", dig_e1_e7, 6)[0]))
+
+    def _set_calibration(self, dig):
+        self.dig_T1, self.dig_T2, self.dig_T3, self.dig_P1, \
+            self.dig_P2, self.dig_P3, self.dig_P4, self.dig_P5, \
+            self.dig_P6, self.dig_P7, self.dig_P8, self.dig_P9, \
+            self.dig_H1, self.dig_H2, self.dig_H3, self.dig_H4, \
+            self.dig_H5, self.dig_H6 = dig
+        self._cal = calibration_table(*dig)
+
+    def _restore(self, cache):
+        # Calibration from a bme280_cache blob when it was taken from the
+        # chip at this address: dig_T1 and dig_T2 (0x88..0x8B) are trimmed
+        # per part, so they identify the chip where its id cannot
+        import bme280_cache
+        entry = bme280_cache.decode(cache)
+        if entry is None or entry[0] != self.address:
+            return False
+        fingerprint = bytearray(4)
+        self._bus_read_into(0x88, fingerprint)
+        if unpack("<Hh", fingerprint) != entry[1][:2]:
+            return False
+        self._set_calibration(entry[1])
+        return True
+
+    def calibration_blob(self):
+        """
+        Calibration and config of this sensor as a bme280_cache blob, to be
+        passed back as BME280(cache=...) after a reboot
+        """
+        import bme280_cache
+        return bme280_cache.encode(self)
+
+    def _write_register(self, register, value):
+        self._l1_barray[0] = value
+        self._bus_write(register, self._l1_barray)
+        self._shadow[register - BME280_REGISTER_CONTROL_HUM] = value
+
+    def _configure(self):
+        # Bring ctrl_hum, ctrl_meas and config to the current settings,
+        # writing only registers whose shadow differs
+        shadow = self._shadow
+        running = shadow[2] & 0x03 == MODE_NORMAL
+        ctrl_meas = self.pressure_mode << 5 | self.temperature_mode << 2
+        self._trigger[0] = ctrl_meas | MODE_FORCED
+        if self.mode == MODE_NORMAL:
+            ctrl_meas |= MODE_NORMAL
+        config = self.standby << 5 | self.iir << 2
+        if shadow[3] & 0xFC != config:
+            # Writes to config may be ignored outside sleep mode
+            if shadow[2] & 0x03:
+                self._write_register(BME280_REGISTER_CONTROL,
+                                     shadow[2] & 0xFC)
+            self._write_register(BME280_REGISTER_CONTROL_IIR,
+                                 config | (shadow[3] & 0x01))
+        latch = shadow[0] & 0x07 != self.humidity_mode
+        if latch:
+            self._write_register(BME280_REGISTER_CONTROL_HUM,
+                                 self.humidity_mode)
+        # ctrl_hum only takes effect after the following ctrl_meas write,
+        # which in forced mode is the next trigger
+        if shadow[2] != ctrl_meas or (latch and self.mode != MODE_FORCED):
+            self._write_register(BME280_REGISTER_CONTROL, ctrl_meas)
+            if self.mode == MODE_NORMAL and not running:
+                # Started from sleep: until the first conversion ends the
+                # data registers hold stale or reset words
+                time.sleep_us(self._t_max)
+        self._snapshot_ticks = None
+
+    def configure(self, mode=None, temperature=None, pressure=None,
+                  humidity=None, iir=None, standby=None):
+        """
+        Validate and apply any of the power mode (MODE_*), the OSAMPLE_*
+        setting of each channel, the IIR filter (FILTER_*) and the standby
+        time (STANDBY_*) in one register update. Settings left at None are
+        kept; nothing changes when one is invalid.
+        """
+        osamples = range(OSAMPLE_0, OSAMPLE_16 + 1)
+        msg_error = 'Unexpected {0} operating mode value {1}.'
+        for name, value in (("temperature", temperature),
+                            ("pressure", pressure),
+                            ("humidity", humidity)):
+            if value is not None and value not in osamples:
+                raise ValueError(msg_error.format(name, value))
+        if iir is not None and iir not in range(FILTER_OFF, FILTER_16 + 1):
+            raise ValueError(
+                'Unexpected low pass IIR filter setting value {0}.'.format(
+                    iir))
+        if standby is not None and \
+                standby not in range(STANDBY_0_5, STANDBY_20 + 1):
+            raise ValueError(
+                'Unexpected standby time setting value {0}.'.format(standby))
+        if mode is not None and \
+                mode not in (MODE_SLEEP, MODE_FORCED, MODE_NORMAL):
+            raise ValueError('Unexpected power mode value {0}.'.format(mode))
+        if mode is not None:
+            self.mode = mode
+        if iir is not None:
+            self.iir = iir
+        if standby is not None:
+            self.standby = standby
+        if (temperature is not None or pressure is not None or
+                humidity is not None):
+            if temperature is not None:
+                self.temperature_mode = temperature
+            if pressure is not None:
+                self.pressure_mode = pressure
+            if humidity is not None:
+                self.humidity_mode = humidity
+            self._update_timing()
+        self._configure()
+
+    def set_mode(self, mode, standby=None):
+        """
+        Switch the sensor between MODE_SLEEP, MODE_FORCED and MODE_NORMAL.
+
+        In MODE_FORCED every read triggers a conversion and waits for it.
+        In MODE_NORMAL the sensor converts continuously, pausing `standby`
+        between measurements, and reads only fetch the latest result.
+        In MODE_SLEEP no conversion runs and reads return the last result,
+        or measure once when there is none yet. Entering MODE_NORMAL from
+        sleep waits for the first conversion.
+        """
+        self.configure(mode=mode, standby=standby)
+
+    def set_oversampling(self, temperature=None, pressure=None,
+                         humidity=None):
+        """ Change the OSAMPLE_* setting of the given channels """
+        self.configure(temperature=temperature, pressure=pressure,
+                       humidity=humidity)
+
+    def set_iir(self, iir):
+        """ Change the low pass IIR filter coefficient (FILTER_*) """
+        self.configure(iir=iir)
+
+    def set_standby(self, standby):
+        """ Change the normal mode standby time (STANDBY_*) """
+        self.configure(standby=standby)
+
+    def set_channels(self, pressure=True, humidity=True):
+        """
+        Measure temperature alone or with pressure and/or humidity. Skipped
+        channels get OSAMPLE_0, so they add nothing to the conversion time,
+        the burst read or compensation, and read as 0; a channel enabled
+        again gets back the oversampling it had (OSAMPLE_1 at first).
+        """
+        resume = self._resume
+        if not pressure:
+            if self.pressure_mode != OSAMPLE_0:
+                resume[0] = self.pressure_mode
+            pressure = OSAMPLE_0
+        elif self.pressure_mode == OSAMPLE_0:
+            pressure = resume[0]
+        else:
+            pressure = None
+        if not humidity:
+            if self.humidity_mode != OSAMPLE_0:
+                resume[1] = self.humidity_mode
+            humidity = OSAMPLE_0
+        elif self.humidity_mode == OSAMPLE_0:
+            humidity = resume[1]
+        else:
+            humidity = None
+        self.set_oversampling(pressure=pressure, humidity=humidity)
 
     def read_raw_data(self, result):
-        self._l1_barray[0] = (
-            self.pressure_mode << 5 |
-            self.temperature_mode << 2 | 1)
-
-        self.i2c.writeto_mem(
-            self.address,
-            BME280_REGISTER_CONTROL,
-            self._l1_barray)
-
-        osamples_1_16 = [
-            OSAMPLE_1,
-            OSAMPLE_2,
-            OSAMPLE_4,
-            OSAMPLE_8,
-            OSAMPLE_16]
-
-        sleep_time = 1250
-        if self.temperature_mode in osamples_1_16:
-            sleep_time += 2300*(1 << self.temperature_mode)
-        if self.pressure_mode in osamples_1_16:
-            sleep_time += 575 + (2300*(1 << self.pressure_mode))
-        if self.humidity_mode in osamples_1_16:
-            sleep_time += 575 + (2300*(1 << self.humidity_mode))
-        time.sleep_us(sleep_time)
-        while (unpack('<H',
-                      self.i2c.readfrom_mem(
-                          self.address,
-                          BME280_REGISTER_STATUS, 2))[0] & 0x08):
-            time.sleep(0.001)
-        self.i2c.readfrom_mem_into(self.address, 0xF7, self._l8_barray)
-        readout = self._l8_barray
-        raw_press = ((readout[0] << 16) | (readout[1] << 8) | readout[2]) >> 4
-        raw_temp = ((readout[3] << 16) | (readout[4] << 8) | readout[5]) >> 4
-        raw_hum = (readout[6] << 8) | readout[7]
-
-        result[0] = raw_temp
-        result[1] = raw_press
-        result[2] = raw_hum
+        if self.mode == MODE_FORCED:
+            self._measure_forced()
+        self._read_result(result)
+        if (result[0] == 0x80000 and self.mode == MODE_SLEEP and
+                self.temperature_mode != OSAMPLE_0):
+            # Nothing converted since reset: measure once
+            self._measure_forced()
+            self._read_result(result)
+
+    def _read_result(self, result):
+        # Burst read of the measured channels only; the window keeps each
+        # register at its offset from 0xF7 in _l8_barray
+        self._bus_read_into(self._data_register, self._data_window)
+        parse_readout(self._l8_barray, 0, self._channels, result)
+
+    def _start_forced(self):
+        # Not shadowed: the chip returns to sleep after the conversion
+        self._bus_write(BME280_REGISTER_CONTROL, self._trigger)
+        return time.ticks_us()
+
+    def _measure_forced(self):
+        start = self._start_forced()
+        time.sleep_us(self._t_wait)
+        self._wait_ready(start)
+
+    def _wait_ready(self, start):
+        polls = 0
+        delay = self._poll_delay(0)
+        while delay:
+            polls += 1
+            time.sleep_us(delay)
+            delay = self._poll_delay(polls)
+        self._learn_timing(time.ticks_diff(time.ticks_us(), start), polls)
+
+    def _poll_delay(self, polls):
+        # One status poll: 0 once the conversion is done, else the us to
+        # wait before poll number polls + 1, backing off from 100 us to 1 ms
+        if not self._read_status() & _STATUS_MEASURING:
+            return 0
+        return 100 << polls if polls < 4 else 1000
+
+    def _read_status(self):
+        self._bus_read_into(BME280_REGISTER_STATUS, self._l1_barray)
+        return self._l1_barray[0]
+
+    def _update_timing(self):
+        self._t_typ, self._t_max = measurement_time(
+            self.temperature_mode, self.pressure_mode, self.humidity_mode)
+        self._t_wait = self._t_typ
+        # Data registers: pressure 0xF7..0xF9, temperature 0xFA..0xFC,
+        # humidity 0xFD..0xFE
+        channels = CHANNEL_TEMPERATURE
+        start = _REGISTER_TEMPERATURE_DATA
+        end = 0xFD
+        if self.pressure_mode != OSAMPLE_0:
+            channels |= CHANNEL_PRESSURE
+            start = _REGISTER_DATA
+        if self.humidity_mode != OSAMPLE_0:
+            channels |= CHANNEL_HUMIDITY
+            end = 0xFF
+        self._channels = channels
+        self._data_register = start
+        self._data_window = memoryview(self._l8_barray)[
+            start - _REGISTER_DATA:end - _REGISTER_DATA]
+
+    def _learn_timing(self, elapsed, polls):
+        # Track this device's conversion time
+        self._t_wait = learn_wait(self._t_wait, self._t_typ, self._t_max,
+                                  elapsed, polls)
 
     def read_compensated_data(self, result=None):
         """ Get raw data and compensa the same """
         self.read_raw_data(self._l3_resultarray)
-        raw_temp, raw_press, raw_hum = self._l3_resultarray
-        var1 = ((raw_temp >> 3) - (self.dig_T1 << 1)) * (self.dig_T2 >> 11)
-
-        var2 = (raw_temp >> 4) - self.dig_T1
-        var2 = var2 * ((raw_temp >> 4) - self.dig_T1)
-        var2 = ((var2 >> 12) * self.dig_T3) >> 14
-
-        self.t_fine = var1 + var2
-        temp = (self.t_fine * 5 + 128) >> 8
-
-        var1 = self.t_fine - 128000
-        var2 = var1 * var1 * self.dig_P6
-        var2 = var2 + ((var1 * self.dig_P5) << 17)
-        var2 = var2 + (self.dig_P4 << 35)
-        var1 = (((var1 * var1 * self.dig_P3) >> 8) +
-                ((var1 * self.dig_P2) << 12))
-        var1 = (((1 << 47) + var1) * self.dig_P1) >> 33
-        if var1 == 0:
-            pressure = 0
-        else:
-            p = 1048576 - raw_press
-            p = (((p << 31) - var2) * 3125) // var1
-            var1 = (self.dig_P9 * (p >> 13) * (p >> 13)) >> 25
-            var2 = (self.dig_P8 * p) >> 19
-            pressure = ((p + var1 + var2) >> 8) + (self.dig_P7 << 4)
-
-        h = self.t_fine - 76800
-        h = (((((raw_hum << 14) - (self.dig_H4 << 20) -
-                (self.dig_H5 * h)) + 16384)
-              >> 15) * (((((((h * self.dig_H6) >> 10) *
-                            (((h * self.dig_H3) >> 11) + 32768)) >> 10) +
-                          2097152) * self.dig_H2 + 8192) >> 14))
-        h = h - (((((h >> 15) * (h >> 15)) >> 7) * self.dig_H1) >> 4)
-        h = 0 if h < 0 else h
-        h = 419430400 if h > 419430400 else h
-        humidity = h >> 12
-
-        if result:
-            result[0] = temp
-            result[1] = pressure
-            result[2] = humidity
-            return result
-
-        return array("i", (temp, pressure, humidity))
+        return self._compensate_raw(result)
+
+    def _compensate_raw(self, result):
+        if result is None:
+            result = array("i", [0, 0, 0])
+        raw = self._l3_resultarray
+        self.t_fine = _compensate(self._cal, raw[0], raw[1], raw[2], result,
+                                  self._channels)
+        return result
+
+    def read_raw_into(self, buf):
+        """ Fill buf with raw (temperature, pressure, humidity) ADC words """
+        self.read_raw_data(buf)
+        return buf
+
+    def read_compensated_into(self, buf):
+        """
+        Fill buf with the compensated integers: temperature in 0.01 degC,
+        pressure in Pa as Q24.8 and humidity in %RH as Q22.10
+        """
+        return self.read_compensated_data(buf)
+
+    def read_scaled_into(self, buf):
+        """
+        Fill buf with fixed-point values: temperature in hundredths of a
+        degree of temperature_scale, pressure in Pa x 100, humidity in
+        %RH x 100
+        """
+        from bme280_units import scale_into
+        return scale_into(self.read_compensated_data(buf),
+                          self.temperature_scale)
+
+    def snapshot(self, max_age=None):
+        """
+        Return the last compensated array('i') result while it is younger
+        than `max_age` milliseconds (default: the constructor's max_age),
+        otherwise take a new measurement.
+        """
+        if max_age is None:
+            max_age = self.max_age
+        now = time.ticks_ms()
+        if (self._snapshot_ticks is None or
+                time.ticks_diff(now, self._snapshot_ticks) >= max_age):
+            self.read_compensated_data(self._snapshot)
+            self._snapshot_ticks = now
+        return self._snapshot
+
+    def invalidate(self):
+        """ Force the next property read to take a new measurement """
+        self._snapshot_ticks = None
+
+    def enable_stats(self, enable=True):
+        """
+        Count and time each phase of a read (see bme280_stats). Returns the
+        Stats object, or None once disabled.
+        """
+        import bme280_stats
+        if enable:
+            return bme280_stats.attach(self)
+        bme280_stats.detach(self)
 
     @property
     def values(self):
-        temp, pres, humi = self.read_compensated_data()
-        temp = temp/100
-        if self.temperature_scale == 'F':
-            temp = 32 + (temp*1.8)
-        elif self.temperature_scale == 'K':
-            temp = temp + 273.15
+        from bme280_units import to_float
+        return to_float(self.snapshot(), self.temperature_scale)
 
-        pres = pres/256
-        humi = humi/1024
-        return (temp, pres, humi)
+    @property
+    def scaled_values(self):
+        """ values as integers, in the units of read_scaled_into """
+        from bme280_units import scale_into
+        return tuple(scale_into(array("i", self.snapshot()),
+                                self.temperature_scale))
 
     @property
     def formated_values(self):
-        t, p, h = self.values
-        temp = "{} "+self.temperature_scale
-        return (temp.format(t), "{} Pa".format(p), "{} %".format(h))
+        from bme280_units import formatted
+        return formatted(self.values, self.temperature_scale)
 
     @property
     def temperature(self):
@@ -230,7 +631,7 @@ class BME280(object):
 
     @property
     def pressure_precision(self):
-        _, p, _ = self.read_compensated_data()
+        _, p, _ = self.snapshot()
         pi = float(p // 256)
         pd = (p % 256)/256
         return (pi, pd)
@@ -240,6 +641,28 @@ class BME280(object):
         _, _, h = self.values
         return h
 
-    def altitude(self, pressure_sea_level=1013.25):
-        pi, pd = self.pressure_precision()
-        return 44330*(1-((float(pi+pd)/100)/pressure_sea_level)**(1/5.255))
+    def altitude(self, pressure_sea_level=None, sample=None):
+        """
+        Altitude in m by the table based bme280_altitude. The sea level
+        pressure in hPa defaults to the calibrated sea_level; a compensated
+        sample can be given instead of taking snapshot().
+        """
+        from bme280_altitude import altitude_cm
+        if pressure_sea_level is None:
+            sea_level = self.sea_level
+        else:
+            sea_level = int(pressure_sea_level * 100 + 0.5)
+        if sample is None:
+            sample = self.snapshot()
+        return altitude_cm(sample[1], sea_level) / 100
+
+    def calibrate_altitude(self, altitude, sample=None):
+        """
+        Set sea_level (Pa) so that the current pressure, or that of sample,
+        reads as altitude m. Returns the new sea_level.
+        """
+        from bme280_altitude import sea_level_pressure
+        if sample is None:
+            sample = self.snapshot()
+        self.sea_level = sea_level_pressure(sample[1], int(altitude * 100))
+        return self.sea_level
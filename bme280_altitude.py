@@ -0,0 +1,84 @@
+"""
+Integer altitude for bme280.BME280 without pow() per call: the barometric
+formula h = 44330 * (1 - (p / p0) ** (1 / 5.255)) is tabulated once, on
+first use, over pressure ratios 0.25 .. 1.25 and interpolated linearly.
+
+That covers 300 .. 1100 hPa for any sea level pressure from 880 to
+1200 hPa. The interpolation error stays below 0.2 m at 300 hPa and about 2.5 cm
+near sea level; the table takes 1 KB.
+
+Pressures are Q24.8 Pa as in compensated samples, sea level pressures are
+Pa and altitudes are centimetres.
+
+    p = sensor.read_compensated_data()[1]
+    p0 = bme280_altitude.sea_level_pressure(p, 52300)  # known: 523 m
+    bme280_altitude.altitude_cm(p, p0)
+"""
+
+from array import array
+
+# Standard atmosphere at sea level, Pa
+SEA_LEVEL = 101325
+
+# Table of altitude (cm) by pressure ratio in Q20, every 2**-8 from 0.25
+_RATIO_MIN = 1 << 18
+_STEP_BITS = 12
+_ENTRIES = 257
+_table = None
+
+
+def _altitude_table():
+    global _table
+    if _table is None:
+        _table = array("i", [0]) * _ENTRIES
+        for i in range(_ENTRIES):
+            ratio = (_RATIO_MIN + (i << _STEP_BITS)) / (1 << 20)
+            _table[i] = int(round(4433000 * (1 - ratio ** (1 / 5.255))))
+    return _table
+
+
+def _ratio_q20(pressure, sea_level):
+    # pressure / 256 / sea_level in Q20, split so no intermediate leaves
+    # the small int range
+    q, rem = divmod(pressure, sea_level)
+    return (q << 12) + (rem << 12) // sea_level
+
+
+def altitude_cm(pressure, sea_level=SEA_LEVEL):
+    """ Altitude in cm of a Q24.8 pressure, sea level pressure in Pa """
+    ratio = _ratio_q20(pressure, sea_level) - _RATIO_MIN
+    i = ratio >> _STEP_BITS
+    if not 0 <= i < _ENTRIES - 1:
+        raise ValueError(
+            'Unexpected pressure ratio value {0}/2**20.'.format(
+                ratio + _RATIO_MIN))
+    table = _altitude_table()
+    low = table[i]
+    frac = ratio & ((1 << _STEP_BITS) - 1)
+    return low + (((table[i + 1] - low) * frac) >> _STEP_BITS)
+
+
+def sea_level_pressure(pressure, altitude):
+    """
+    Sea level pressure in Pa that puts a Q24.8 pressure at altitude cm, for
+    calibrating against a known elevation (inverse of altitude_cm)
+    """
+    table = _altitude_table()
+    # Table altitudes fall as the ratio grows
+    lo = 0
+    hi = _ENTRIES - 1
+    if not table[hi] <= altitude <= table[lo]:
+        raise ValueError('Unexpected altitude value {0}.'.format(altitude))
+    while hi - lo > 1:
+        mid = (lo + hi) >> 1
+        if table[mid] >= altitude:
+            lo = mid
+        else:
+            hi = mid
+    span = table[lo] - table[hi]
+    frac = ((table[lo] - altitude) << _STEP_BITS) // span if span else 0
+    ratio = _RATIO_MIN + (lo << _STEP_BITS) + frac
+    # pressure / 256 / (ratio / 2**20), rounded, in small int steps
+    q, rem = divmod(pressure, ratio)
+    q1, rem = divmod(rem << 6, ratio)
+    return (q << 12) + (q1 << 6) + ((rem << 6) + (ratio >> 1)) // ratio
@@ -0,0 +1,75 @@
+"""
+asyncio (uasyncio) front end for bme280.BME280. Conversion waits and status
+polling yield to the scheduler instead of blocking the event loop; register
+access and compensation are the ones of the synchronous driver.
+
+    sensor = bme280_async.BME280(i2c=i2c)
+    temp, pres, humi = await sensor.read_async()
+    async for sample in sensor.samples(1000):
+        ...
+"""
+
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+import time
+import bme280
+
+
+class BME280(bme280.BME280):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lock = asyncio.Lock()
+
+    async def read_raw_async(self, result):
+        """ Awaitable read_raw_data """
+        async with self._lock:
+            if self.mode == bme280.MODE_FORCED:
+                start = self._start_forced()
+                await asyncio.sleep(self._t_wait / 1000000)
+                polls = 0
+                delay = self._poll_delay(0)
+                while delay:
+                    polls += 1
+                    await asyncio.sleep(delay / 1000000)
+                    delay = self._poll_delay(polls)
+                self._learn_timing(
+                    time.ticks_diff(time.ticks_us(), start), polls)
+            self._read_result(result)
+        return result
+
+    async def read_async(self, result=None):
+        """ Awaitable read_compensated_data """
+        await self.read_raw_async(self._l3_resultarray)
+        return self._compensate_raw(result)
+
+    def samples(self, period_ms=1000, result=None):
+        """
+        Async iterator of compensated samples, one every period_ms. A new
+        array is returned per sample unless a result buffer is given.
+        """
+        return _Samples(self, period_ms, result)
+
+
+class _Samples(object):
+    # MicroPython has no async generators, hence the explicit iterator
+
+    def __init__(self, sensor, period_ms, result):
+        self._sensor = sensor
+        self._period_us = period_ms * 1000
+        self._result = result
+        self._last = None
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._last is not None:
+            delay = self._period_us - time.ticks_diff(
+                time.ticks_us(), self._last)
+            if delay > 0:
+                await asyncio.sleep(delay / 1000000)
+        self._last = time.ticks_us()
+        return await self._sensor.read_async(self._result)
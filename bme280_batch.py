@@ -0,0 +1,96 @@
+"""
+Batch compensation of logged BME280 raw samples, for host-side processing.
+
+Raw samples are the (temperature, pressure, humidity) triples filled by
+BME280.read_raw_data, stored back to back. Results are bit-exact with
+BME280.read_compensated_data. NumPy is used when it is installed,
+otherwise a plain loop over bme280.compensate() runs.
+"""
+
+from array import array
+import bme280
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def calibration_of(sensor):
+    """ The 18 dig_* calibration values of a BME280, in datasheet order """
+    return (sensor.dig_T1, sensor.dig_T2, sensor.dig_T3,
+            sensor.dig_P1, sensor.dig_P2, sensor.dig_P3, sensor.dig_P4,
+            sensor.dig_P5, sensor.dig_P6, sensor.dig_P7, sensor.dig_P8,
+            sensor.dig_P9,
+            sensor.dig_H1, sensor.dig_H2, sensor.dig_H3, sensor.dig_H4,
+            sensor.dig_H5, sensor.dig_H6)
+
+
+def compensate_batch(calibration, raw):
+    """
+    Compensate N raw triples with the values from calibration_of().
+
+    raw is a flat array('i'), memoryview or NumPy array of 3*N ints, or an
+    (N, 3) NumPy array. Returns (temperature, pressure, humidity) in the
+    units of read_compensated_data: NumPy int32 arrays when NumPy is
+    available, array('i') otherwise.
+    """
+    cal = bme280.calibration_table(*calibration)
+    if numpy is not None:
+        return _compensate_numpy(cal, raw)
+    return _compensate_loop(cal, raw)
+
+
+def _compensate_loop(cal, raw):
+    count = len(raw) // 3
+    temperature = array("i", [0]) * count
+    pressure = array("i", [0]) * count
+    humidity = array("i", [0]) * count
+    result = array("i", [0, 0, 0])
+    compensate = bme280.compensate
+    for i in range(count):
+        j = 3 * i
+        compensate(cal, raw[j], raw[j + 1], raw[j + 2], result)
+        temperature[i] = result[0]
+        pressure[i] = result[1]
+        humidity[i] = result[2]
+    return temperature, pressure, humidity
+
+
+def _compensate_numpy(cal, raw):
+    # Same steps as bme280.compensate() on int64 columns; every
+    # intermediate stays below 2**63 for 20-bit T/P and 16-bit H words.
+    t1, t1_x2, t2_11, t3, \
+        p1, p1_14, p2_12, p3, p4_35, p5_17, p6, p7_4, p8, p9, \
+        h1, h2, h3, h4_20, h5, h6 = cal
+    raw = numpy.asarray(raw, dtype=numpy.int64).reshape(-1, 3)
+    raw_temp = raw[:, 0]
+    raw_press = raw[:, 1]
+    raw_hum = raw[:, 2]
+
+    var2 = (raw_temp >> 4) - t1
+    t_fine = (((raw_temp >> 3) - t1_x2) * t2_11 +
+              ((((var2 * var2) >> 12) * t3) >> 14))
+    temperature = (t_fine * 5 + 128) >> 8
+
+    var1 = t_fine - 128000
+    var2 = var1 * var1 * p6 + var1 * p5_17 + p4_35
+    var1 = ((var1 * var1 * p3) >> 8) + var1 * p2_12
+    var1 = p1_14 + ((var1 * p1) >> 33)
+    invalid = var1 == 0
+    var1[invalid] = 1
+    p, rem = numpy.divmod(((1048576 - raw_press) << 31) - var2, var1)
+    p = p * 3125 + (rem * 3125) // var1
+    pressure = (((p + ((p9 * (p >> 13) * (p >> 13)) >> 25) +
+                  ((p8 * p) >> 19)) >> 8) + p7_4)
+    pressure[invalid] = 0
+
+    h = t_fine - 76800
+    h = (((((raw_hum << 14) - h4_20 - (h5 * h)) + 16384) >> 15) *
+         (((((((h * h6) >> 10) * (((h * h3) >> 11) + 32768)) >> 10) +
+            2097152) * h2 + 8192) >> 14))
+    h = h - (((((h >> 15) * (h >> 15)) >> 7) * h1) >> 4)
+    humidity = numpy.clip(h, 0, 419430400) >> 12
+
+    return (temperature.astype(numpy.int32), pressure.astype(numpy.int32),
+            humidity.astype(numpy.int32))
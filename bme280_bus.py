@@ -0,0 +1,87 @@
+"""
+Transports for bme280.BME280. A bus provides two register primitives:
+
+    read_into(register, buf)  burst read len(buf) bytes starting at register
+    write(register, buf)      write buf to consecutive registers
+
+and is passed as BME280(bus=...). Without a bus the driver wraps its i2c
+object in I2CBus.
+"""
+
+from bme280 import I2CBus
+
+BME280_REGISTER_CONFIG = 0xF5
+
+
+class SPIBus(object):
+    """
+    Register access over SPI mode 0 or 3 (up to 10 MHz); cs is the
+    active-low chip select Pin. The read bit (0x80) is set on the address
+    byte of reads and cleared on writes.
+
+    With three_wire=True the spi object must drive the shared SDI/SDO line;
+    spi3w_en is set at construction and kept set on every config write.
+    """
+
+    def __init__(self, spi, cs, three_wire=False):
+        self.spi = spi
+        self.cs = cs
+        self.three_wire = three_wire
+        self._address = bytearray(1)
+        self._pair = bytearray(2)
+        cs(1)
+        if three_wire:
+            self.write(BME280_REGISTER_CONFIG, b'\x00')
+
+    def read_into(self, register, buf):
+        self._address[0] = register | 0x80
+        self.cs(0)
+        try:
+            self.spi.write(self._address)
+            self.spi.readinto(buf)
+        finally:
+            self.cs(1)
+
+    def write(self, register, buf):
+        # SPI writes send an address byte before every data byte
+        pair = self._pair
+        self.cs(0)
+        try:
+            for i in range(len(buf)):
+                value = buf[i]
+                if self.three_wire and register + i == BME280_REGISTER_CONFIG:
+                    value |= 0x01
+                pair[0] = (register + i) & 0x7F
+                pair[1] = value
+                self.spi.write(pair)
+        finally:
+            self.cs(1)
+
+
+class FakeBus(object):
+    """
+    In-memory register file. registers maps a start register to the bytes
+    stored from there, e.g. the calibration blocks and a readout. Unless
+    set, status reads 0 and forced conversions complete at once.
+    """
+
+    def __init__(self, registers=None):
+        self.registers = bytearray(256)
+        if registers:
+            for register, data in registers.items():
+                self.registers[register:register + len(data)] = data
+        self.reads = 0
+        self.writes = 0
+
+    # Byte loops rather than slices, so reads and writes do not allocate
+    def read_into(self, register, buf):
+        self.reads += 1
+        registers = self.registers
+        for i in range(len(buf)):
+            buf[i] = registers[register + i]
+
+    def write(self, register, buf):
+        self.writes += 1
+        registers = self.registers
+        for i in range(len(buf)):
+            registers[register + i] = buf[i]
@@ -0,0 +1,88 @@
+"""
+Calibration cache for bme280.BME280, for nodes that deep-sleep between
+samples. The parsed calibration is packed into a 37 byte blob keyed by
+address; constructing the driver with BME280(cache=blob) then skips the
+33 byte NVM read for a 4 byte one of dig_T1 and dig_T2, which tells chips
+apart where the chip id (0x60 on every BME280) cannot. When the chip still
+holds the wanted config every register write is skipped too.
+
+    blob = bme280_cache.rtc_load()            # or load("bme280.cal")
+    sensor = bme280.BME280(i2c=i2c, cache=blob)
+    if blob is None:
+        bme280_cache.rtc_save(sensor)         # or save(sensor, "bme280.cal")
+
+A blob for another chip or address, or a damaged one, is ignored and the
+driver initialises as without a cache.
+"""
+
+try:
+    from ustruct import pack, unpack_from, calcsize
+except ImportError:
+    from struct import pack, unpack_from, calcsize
+
+# magic, address, dig_T1..dig_H6 and a checksum byte
+_FORMAT = "<2sBHhhHhhhhhhhhBhBhhb"
+_MAGIC = b'B2'
+SIZE = calcsize(_FORMAT) + 1
+
+
+def _checksum(data):
+    return sum(data) & 0xFF
+
+
+def encode(sensor):
+    """ Blob of the calibration of a bme280.BME280 """
+    data = pack(_FORMAT, _MAGIC, sensor.address,
+                sensor.dig_T1, sensor.dig_T2, sensor.dig_T3,
+                sensor.dig_P1, sensor.dig_P2, sensor.dig_P3, sensor.dig_P4,
+                sensor.dig_P5, sensor.dig_P6, sensor.dig_P7, sensor.dig_P8,
+                sensor.dig_P9,
+                sensor.dig_H1, sensor.dig_H2, sensor.dig_H3, sensor.dig_H4,
+                sensor.dig_H5, sensor.dig_H6)
+    return data + bytes((_checksum(data),))
+
+
+def decode(blob):
+    """
+    (address, calibration) of a blob, or None when it is not a valid blob.
+    calibration holds the 18 dig_* values in datasheet order.
+    """
+    if (not blob or len(blob) < SIZE or blob[:2] != _MAGIC or
+            _checksum(blob[:SIZE - 1]) != blob[SIZE - 1]):
+        return None
+    fields = unpack_from(_FORMAT, blob)
+    return fields[1], fields[2:20]
+
+
+def save(sensor, path="bme280.cal"):
+    with open(path, "wb") as f:
+        f.write(encode(sensor))
+
+
+def load(path="bme280.cal"):
+    """ Blob stored by save(), or None without one """
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def rtc_save(sensor, rtc=None):
+    """
+    Keep the blob in RTC memory, which survives deep sleep but not a power
+    loss. The whole user RTC memory is overwritten.
+    """
+    if rtc is None:
+        from machine import RTC
+        rtc = RTC()
+    rtc.memory(encode(sensor))
+
+
+def rtc_load(rtc=None):
+    """ Blob stored by rtc_save(), or None after a cold boot """
+    if rtc is None:
+        from machine import RTC
+        rtc = RTC()
+    blob = rtc.memory()
+    return blob if decode(blob) is not None else None
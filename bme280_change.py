@@ -0,0 +1,132 @@
+"""
+Change detection on top of bme280.BME280: each poll() compares the raw ADC
+words with those of the last reported sample and, while every channel
+stays within its deadband, returns None without compensating. Only a
+significant change is compensated, passed to on_change and checked
+against the thresholds.
+
+    detector = bme280_change.ChangeDetector(sensor, on_change=publish)
+    detector.add_threshold(bme280_change.TEMPERATURE, 3000, alarm)
+    while True:
+        detector.poll()
+        time.sleep_ms(1000)
+
+Deadbands are in raw counts. With typical calibrations one count is about
+0.0002 degC, 0.17 Pa and 0.006 %RH, so the default (250, 6, 18) ignores
+moves below 0.05 degC, 1 Pa and 0.1 %RH. The comparison is against the
+last reported sample, not the previous poll, so a slow drift is reported
+once it adds up to a deadband.
+"""
+
+import time
+from array import array
+
+TEMPERATURE = 0
+PRESSURE = 1
+HUMIDITY = 2
+
+DEADBAND = (250, 6, 18)
+
+
+class ChangeDetector(object):
+
+    def __init__(self, sensor, deadband=DEADBAND, on_change=None,
+                 heartbeat=None):
+        """
+        on_change(sample) gets each reported compensated sample. heartbeat
+        reports a sample after that many quiet polls even without change.
+        """
+        self.sensor = sensor
+        self.deadband = array("i", deadband)
+        self.on_change = on_change
+        self.heartbeat = heartbeat
+        self._raw = array("i", [0, 0, 0])
+        self._reference = array("i", [0, 0, 0])
+        self._primed = False
+        self._quiet = 0
+        self.sample = array("i", [0, 0, 0])
+        self._thresholds = []
+        self.polls = 0
+        self.skipped = 0
+
+    def add_threshold(self, channel, level, callback, hysteresis=0):
+        """
+        Call callback(channel, rising, sample) when the compensated value of
+        channel (TEMPERATURE, PRESSURE or HUMIDITY, in the units of
+        read_compensated_data) rises to level or falls below level minus
+        hysteresis. Only reported samples are checked, so crossings finer
+        than the deadband are seen late by up to one deadband.
+        """
+        if channel not in (TEMPERATURE, PRESSURE, HUMIDITY):
+            raise ValueError('Unexpected channel value {0}.'.format(channel))
+        # channel, level, hysteresis, callback, above (None until known)
+        self._thresholds.append([channel, level, hysteresis, callback, None])
+
+    def reset(self):
+        """ Report the next poll whatever it reads """
+        self._primed = False
+
+    def _moved(self):
+        raw = self._raw
+        reference = self._reference
+        deadband = self.deadband
+        for c in range(3):
+            d = raw[c] - reference[c]
+            if d > deadband[c] or -d > deadband[c]:
+                return True
+        return False
+
+    def poll(self):
+        """
+        Read a raw sample; return the compensated sample array when it was
+        reported, None when it was skipped as unchanged.
+        """
+        sensor = self.sensor
+        raw = self._raw
+        self.polls += 1
+        sensor.read_raw_data(raw)
+        if self._primed and not self._moved():
+            self._quiet += 1
+            if self.heartbeat is None or self._quiet < self.heartbeat:
+                self.skipped += 1
+                return None
+        self._quiet = 0
+        self._primed = True
+        reference = self._reference
+        reference[0] = raw[0]
+        reference[1] = raw[1]
+        reference[2] = raw[2]
+        sample = self.sample
+        # Same path as read_compensated_data, minus the bus
+        scratch = sensor._l3_resultarray
+        scratch[0] = raw[0]
+        scratch[1] = raw[1]
+        scratch[2] = raw[2]
+        sensor._compensate_raw(sample)
+        if self.on_change is not None:
+            self.on_change(sample)
+        for threshold in self._thresholds:
+            channel, level, hysteresis, callback, above = threshold
+            value = sample[channel]
+            if value >= level:
+                now = True
+            elif value < level - hysteresis:
+                now = False
+            else:
+                now = above
+            if now != above:
+                threshold[4] = now
+                if above is not None:
+                    callback(channel, now, sample)
+        return sample
+
+    def changes(self, period_ms):
+        """ Poll every period_ms and yield only the reported samples """
+        while True:
+            start = time.ticks_ms()
+            sample = self.poll()
+            if sample is not None:
+                yield sample
+            elapsed = time.ticks_diff(time.ticks_ms(), start)
+            if elapsed < period_ms:
+                time.sleep_ms(period_ms - elapsed)
@@ -0,0 +1,172 @@
+"""
+Derived quantities for bme280.BME280 in integers: saturation vapour
+pressure, dew point, absolute humidity and heat index, without float math
+per call. Sea level pressure from a known elevation is
+bme280_altitude.sea_level_pressure.
+
+Inputs are in the units of BME280.read_compensated_data: temperature in
+0.01 degC, humidity in %RH as Q22.10. Outputs are 0.01 degC (convert with
+bme280_units.centi_degrees), Pa x 100 and mg/m3.
+
+    t, p, h = sensor.read_compensated_data()
+    bme280_derived.dew_point(t, h)          # 1432 -> 14.32 degC
+    bme280_derived.absolute_humidity(t, h)  # 12205 -> 12.205 g/m3
+
+The saturation vapour pressure follows the Magnus formula over water
+(e_s = 611.2 * exp(17.62 * T / (243.12 + T)) Pa), tabulated once per
+degree from -60 to 86 degC and interpolated linearly, within 0.1% of the
+formula. The heat index follows the NWS algorithm: its simple formula and
+the low and high humidity adjustments are computed directly, the Rothfusz
+regression that takes over above about 80 degF is tabulated per degree and
+5 %RH from 26 to 51 degC and interpolated within about 0.1 degC. Tables are
+built on first use.
+"""
+
+from array import array
+
+# Saturation vapour pressure table, Pa x 100 per degC
+_E_T_MIN = -60
+_E_ENTRIES = 147
+_e_table = None
+
+# dew_point() of air drier than the saturation table covers, 0.01 degC
+DEW_POINT_MIN = _E_T_MIN * 100
+
+# Heat index table, 0.01 degC per degC (rows) and 5 %RH (columns)
+_HI_T_MIN = 26
+_HI_ROWS = 26
+_HI_COLUMNS = 21
+_hi_table = None
+
+# Water vapour density per vapour pressure and temperature:
+# M_w / R = 2.16679 g K / J, as mg/m3 per Pa x 100 and 0.01 K
+_WATER_FACTOR = 2167
+
+
+def _saturation_table():
+    global _e_table
+    if _e_table is None:
+        from math import exp
+        _e_table = array("i", [0]) * _E_ENTRIES
+        for i in range(_E_ENTRIES):
+            t = _E_T_MIN + i
+            _e_table[i] = int(round(61120 * exp(17.62 * t / (243.12 + t))))
+    return _e_table
+
+
+def _rothfusz(t, rh):
+    # NWS heat index regression in degF of t degF at rh %RH
+    return (-42.379 + 2.04901523 * t + 10.14333127 * rh - 0.22475541 * t * rh
+            - 0.00683783 * t * t - 0.05481717 * rh * rh
+            + 0.00122874 * t * t * rh + 0.00085282 * t * rh * rh
+            - 0.00000199 * t * t * rh * rh)
+
+
+def _heat_index_table():
+    global _hi_table
+    if _hi_table is None:
+        _hi_table = array("i", [0]) * (_HI_ROWS * _HI_COLUMNS)
+        for i in range(_HI_ROWS):
+            t = (_HI_T_MIN + i) * 1.8 + 32
+            for j in range(_HI_COLUMNS):
+                hi = (_rothfusz(t, j * 5) - 32) / 1.8
+                _hi_table[i * _HI_COLUMNS + j] = int(round(hi * 100))
+    return _hi_table
+
+
+def _isqrt(n):
+    x = n
+    y = (x + 1) >> 1
+    while y < x:
+        x = y
+        y = (x + n // x) >> 1
+    return x
+
+
+def _percent(humidity):
+    # Q22.10 %RH to %RH x 100
+    return (humidity * 25 + 128) >> 8
+
+
+def saturation_pressure(temperature):
+    """ Saturation vapour pressure over water in Pa x 100 """
+    i, frac = divmod(temperature - _E_T_MIN * 100, 100)
+    if not 0 <= i < _E_ENTRIES - 1:
+        raise ValueError('Unexpected temperature value {0}.'.format(
+            temperature))
+    table = _saturation_table()
+    low = table[i]
+    return low + (table[i + 1] - low) * frac // 100
+
+
+def vapour_pressure(temperature, humidity):
+    """ Partial pressure of water vapour in Pa x 100 """
+    # e_s * %RH x 100 / 10000, split to stay in the small int range
+    q, rem = divmod(saturation_pressure(temperature), 10000)
+    rh = _percent(humidity)
+    return q * rh + rem * rh // 10000
+
+
+def dew_point(temperature, humidity):
+    """
+    Dew point in 0.01 degC, by inverting saturation_pressure(). Air too dry
+    for a dew point within the table, including 0 %RH, returns its floor
+    DEW_POINT_MIN (-60 degC).
+    """
+    e = vapour_pressure(temperature, humidity)
+    table = _saturation_table()
+    if e <= table[0]:
+        return DEW_POINT_MIN
+    lo = 0
+    hi = _E_ENTRIES - 1
+    while hi - lo > 1:
+        mid = (lo + hi) >> 1
+        if table[mid] <= e:
+            lo = mid
+        else:
+            hi = mid
+    low = table[lo]
+    return ((_E_T_MIN + lo) * 100 +
+            ((e - low) * 100 + ((table[hi] - low) >> 1)) // (table[hi] - low))
+
+
+def absolute_humidity(temperature, humidity):
+    """ Water vapour density in mg/m3 """
+    kelvin = temperature + 27315
+    q, rem = divmod(vapour_pressure(temperature, humidity), kelvin)
+    return q * _WATER_FACTOR + (rem * _WATER_FACTOR + (kelvin >> 1)) // kelvin
+
+
+def heat_index(temperature, humidity):
+    """ Apparent temperature in 0.01 degC, up to 51 degC air temperature """
+    rh = _percent(humidity)
+    if rh > 10000:
+        rh = 10000
+    # NWS simple formula, 1.1 T - 3.9444 + 0.026111 RH in degC, used
+    # while its mean with T stays below 80 degF
+    simple = (110 * temperature + rh * 26111 // 10000 - 39444 + 50) // 100
+    if 3 * (simple + temperature) < 16000:
+        return simple
+    i, ft = divmod(temperature - _HI_T_MIN * 100, 100)
+    if i >= _HI_ROWS - 1:
+        raise ValueError('Unexpected temperature value {0}.'.format(
+            temperature))
+    j, fh = divmod(rh, 500)
+    if j == _HI_COLUMNS - 1:
+        j -= 1
+        fh = 500
+    table = _heat_index_table()
+    k = i * _HI_COLUMNS + j
+    low = table[k] + (table[k + 1] - table[k]) * fh // 500
+    k += _HI_COLUMNS
+    high = table[k] + (table[k + 1] - table[k]) * fh // 500
+    hi = low + (high - low) * ft // 100
+    # NWS adjustments, in degF (13 - RH) / 4 * sqrt((17 - |T - 95|) / 17)
+    # and (RH - 85) / 10 * (87 - T) / 5, here with 9 t = 500 T - 16000
+    nine_t = 9 * temperature
+    if rh < 1300 and 24000 <= nine_t <= 40000:
+        root = _isqrt(((8500 - abs(nine_t - 31500)) << 24) // 8500)
+        hi -= (1300 - rh) * root * 5 // 147456
+    elif rh > 8500 and 24000 <= nine_t <= 27500:
+        hi += (rh - 8500) * (27500 - nine_t) // 45000
+    return hi
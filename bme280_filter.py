@@ -0,0 +1,191 @@
+"""
+Software filters for streams of (temperature, pressure, humidity) samples,
+raw or compensated, as an alternative to the on-chip IIR filter: run the
+chip with a short oversampling and FILTER_OFF, and smooth or decimate here.
+
+Every filter keeps its state in preallocated arrays and has the same call:
+
+    f = bme280_filter.MovingAverage(8, decimation=4)
+    if f.update(sample, out):   # True when out holds a new output
+        ...
+
+MovingAverage and IIR cost O(1) per sample; Median sorts its window
+incrementally, O(n) for the small n it is meant for.
+"""
+
+from array import array
+
+
+class _Filter(object):
+
+    def __init__(self, decimation):
+        if decimation < 1:
+            raise ValueError('Unexpected decimation value {0}.'.format(
+                decimation))
+        self.decimation = decimation
+        self._phase = 0
+
+    def _emit(self):
+        # True for every decimation-th input
+        self._phase += 1
+        if self._phase < self.decimation:
+            return False
+        self._phase = 0
+        return True
+
+
+class MovingAverage(_Filter):
+    """ Mean of the last n samples, from running sums """
+
+    def __init__(self, n, decimation=1):
+        if n < 1:
+            raise ValueError('Unexpected window length value {0}.'.format(n))
+        _Filter.__init__(self, decimation)
+        self.n = n
+        self._window = array("i", [0]) * (3 * n)
+        self._sums = [0, 0, 0]
+        self._pos = 0
+        self._count = 0
+
+    def reset(self):
+        self._sums[0] = self._sums[1] = self._sums[2] = 0
+        self._pos = 0
+        self._count = 0
+        self._phase = 0
+
+    def update(self, sample, out):
+        window = self._window
+        sums = self._sums
+        i = 3 * self._pos
+        if self._count == self.n:
+            sums[0] -= window[i]
+            sums[1] -= window[i + 1]
+            sums[2] -= window[i + 2]
+        else:
+            self._count += 1
+        window[i] = sample[0]
+        window[i + 1] = sample[1]
+        window[i + 2] = sample[2]
+        sums[0] += sample[0]
+        sums[1] += sample[1]
+        sums[2] += sample[2]
+        self._pos += 1
+        if self._pos == self.n:
+            self._pos = 0
+        if not self._emit():
+            return False
+        count = self._count
+        half = count >> 1
+        out[0] = (sums[0] + half) // count
+        out[1] = (sums[1] + half) // count
+        out[2] = (sums[2] + half) // count
+        return True
+
+
+class Median(_Filter):
+    """
+    Median of the last n samples per channel (n odd), which rejects
+    single-sample spikes that an average would smear.
+    """
+
+    def __init__(self, n=3, decimation=1):
+        if n < 1 or not n & 1:
+            raise ValueError('Unexpected window length value {0}.'.format(n))
+        _Filter.__init__(self, decimation)
+        self.n = n
+        # Per channel: the samples in arrival order and the same sorted
+        self._window = array("i", [0]) * (3 * n)
+        self._sorted = array("i", [0]) * (3 * n)
+        self._pos = 0
+        self._count = 0
+
+    def reset(self):
+        self._pos = 0
+        self._count = 0
+        self._phase = 0
+
+    def update(self, sample, out):
+        n = self.n
+        count = self._count
+        full = count == n
+        for c in range(3):
+            base = c * n
+            value = sample[c]
+            srt = self._sorted
+            if full:
+                # Drop the oldest value from the sorted run
+                old = self._window[base + self._pos]
+                j = base
+                while srt[j] != old:
+                    j += 1
+                end = base + n - 1
+                while j < end:
+                    srt[j] = srt[j + 1]
+                    j += 1
+                length = n - 1
+            else:
+                length = count
+            # Insert the new one
+            j = base + length
+            while j > base and srt[j - 1] > value:
+                srt[j] = srt[j - 1]
+                j -= 1
+            srt[j] = value
+            self._window[base + self._pos] = value
+        if not full:
+            self._count = count = count + 1
+        self._pos += 1
+        if self._pos == n:
+            self._pos = 0
+        if not self._emit():
+            return False
+        mid = count >> 1
+        out[0] = self._sorted[mid]
+        out[1] = self._sorted[n + mid]
+        out[2] = self._sorted[2 * n + mid]
+        return True
+
+
+class IIR(_Filter):
+    """
+    First order low pass y += (x - y) / 2**shift in fixed point with 4
+    fractional bits, optionally decimating. shift=4 matches the settling of
+    the chip's FILTER_16 at the input rate.
+    """
+
+    FRACTION = 4
+
+    def __init__(self, shift=2, decimation=1):
+        if not 0 <= shift <= 8:
+            raise ValueError('Unexpected filter shift value {0}.'.format(
+                shift))
+        _Filter.__init__(self, decimation)
+        self.shift = shift
+        self._state = array("i", [0, 0, 0])
+        self._primed = False
+
+    def reset(self):
+        self._primed = False
+        self._phase = 0
+
+    def update(self, sample, out):
+        state = self._state
+        frac = self.FRACTION
+        if not self._primed:
+            # Start from the first sample instead of ramping up from zero
+            state[0] = sample[0] << frac
+            state[1] = sample[1] << frac
+            state[2] = sample[2] << frac
+            self._primed = True
+        else:
+            shift = self.shift
+            state[0] += ((sample[0] << frac) - state[0]) >> shift
+            state[1] += ((sample[1] << frac) - state[1]) >> shift
+            state[2] += ((sample[2] << frac) - state[2]) >> shift
+        if not self._emit():
+            return False
+        half = 1 << (frac - 1)
+        out[0] = (state[0] + half) >> frac
+        out[1] = (state[1] + half) >> frac
+        out[2] = (state[2] + half) >> frac
+        return True
@@ -0,0 +1,79 @@
+"""
+Reads several bme280.BME280 sensors with overlapped conversions: forced mode
+is triggered on every sensor first, then one wait covers the slowest
+conversion and each sensor is burst-read in turn. A cycle costs about one
+conversion time whatever the number of sensors.
+
+Sensors may sit on different I2C buses; for sensors behind a multiplexer
+pass a select callable that switches the mux to the sensor's channel.
+"""
+
+import time
+from array import array
+import bme280
+
+
+class BME280Group(object):
+
+    def __init__(self, sensors=()):
+        self.sensors = []
+        self._selects = []
+        self._starts = []
+        self._sample = array("i", [0, 0, 0])
+        for sensor in sensors:
+            self.add(sensor)
+
+    def add(self, sensor, select=None):
+        """ Add a sensor; select() is called before each access to it """
+        self.sensors.append(sensor)
+        self._selects.append(select)
+        self._starts.append(0)
+
+    def __len__(self):
+        return len(self.sensors)
+
+    def read(self, result=None):
+        """
+        Measure every sensor and return an array('i') holding the
+        compensated (temperature, pressure, humidity) of sensor i at
+        result[3 * i:3 * i + 3].
+        """
+        sensors = self.sensors
+        selects = self._selects
+        starts = self._starts
+        count = len(sensors)
+        if result is None:
+            result = array("i", [0]) * (3 * count)
+
+        wait = 0
+        first = None
+        for i in range(count):
+            sensor = sensors[i]
+            if sensor.mode != bme280.MODE_FORCED:
+                continue
+            if selects[i] is not None:
+                selects[i]()
+            starts[i] = sensor._start_forced()
+            if first is None:
+                first = starts[i]
+            if sensor._t_wait > wait:
+                wait = sensor._t_wait
+        if first is not None:
+            wait -= time.ticks_diff(time.ticks_us(), first)
+            if wait > 0:
+                time.sleep_us(wait)
+
+        sample = self._sample
+        for i in range(count):
+            sensor = sensors[i]
+            if selects[i] is not None:
+                selects[i]()
+            if sensor.mode == bme280.MODE_FORCED:
+                sensor._wait_ready(starts[i])
+            sensor._read_result(sensor._l3_resultarray)
+            sensor._compensate_raw(sample)
+            j = 3 * i
+            result[j] = sample[0]
+            result[j + 1] = sample[1]
+            result[j + 2] = sample[2]
+        return result
@@ -1,189 +1,188 @@
-"""
-MicroPython driver for BME280 Temperature, Pressure and Humidity, developer version, specific for BBC Micro:bit :
-https://github.com/neliogodoi/MicroPython-BME280
-Version: 0.1.0 @ 2018/06/21
-"""
-
-from time import sleep, sleep_us
-from ustruct import unpack, unpack_from
+# Generated from bme280_small.py.in by build.py --variants, do not edit.
+from time import sleep_us
 from array import array
-
 BME280_I2CADDR = 0x76
-
+OSAMPLE_0 = 0
+CHANNEL_PRESSURE = 2
+CHANNEL_HUMIDITY = 4
+CHANNELS_ALL = 7
+def calibration_table(t1, t2, t3, p1, p2, p3, p4, p5, p6, p7, p8, p9,
+     h1, h2, h3, h4, h5, h6):
+ return (t1, t1 << 1, t2 >> 11, t3,
+   p1, p1 << 14, p2 << 12, p3, p4 << 35, p5 << 17, p6, p7 << 4,
+   p8, p9,
+   h1, h2, h3, h4 << 20, h5, h6)
+def compensate(cal, raw_temp, raw_press, raw_hum, result,
+   channels=CHANNELS_ALL):
+ t1, t1_x2, t2_11, t3, \
+  p1, p1_14, p2_12, p3, p4_35, p5_17, p6, p7_4, p8, p9, \
+  h1, h2, h3, h4_20, h5, h6 = cal
+ var2 = (raw_temp >> 4) - t1
+ t_fine = (((raw_temp >> 3) - t1_x2) * t2_11 +
+   ((((var2 * var2) >> 12) * t3) >> 14))
+ result[0] = (t_fine * 5 + 128) >> 8
+ if channels & CHANNEL_PRESSURE:
+  var1 = t_fine - 128000
+  var2 = var1 * var1 * p6 + var1 * p5_17 + p4_35
+  var1 = ((var1 * var1 * p3) >> 8) + var1 * p2_12
+  var1 = p1_14 + ((var1 * p1) >> 33)
+  if var1 == 0:
+   result[1] = 0
+  else:
+   x = ((1048576 - raw_press) << 31) - var2
+   p = x // var1
+   p = p * 3125 + ((x - p * var1) * 3125) // var1
+   result[1] = (((p + ((p9 * (p >> 13) * (p >> 13)) >> 25) +
+      ((p8 * p) >> 19)) >> 8) + p7_4)
+ else:
+  result[1] = 0
+ if channels & CHANNEL_HUMIDITY:
+  h = t_fine - 76800
+  h = (((((raw_hum << 14) - h4_20 - (h5 * h)) + 16384) >> 15) *
+   (((((((h * h6) >> 10) * (((h * h3) >> 11) + 32768)) >> 10) +
+    2097152) * h2 + 8192) >> 14))
+  h = h - (((((h >> 15) * (h >> 15)) >> 7) * h1) >> 4)
+  if h < 0:
+   h = 0
+  elif h > 419430400:
+   h = 419430400
+  result[2] = h >> 12
+ else:
+  result[2] = 0
+ return t_fine
+def measurement_time(temperature_mode, pressure_mode, humidity_mode):
+ t_typ = 1000
+ t_max = 1250
+ if temperature_mode != OSAMPLE_0:
+  t_typ += 2000 << (temperature_mode - 1)
+  t_max += 2300 << (temperature_mode - 1)
+ if pressure_mode != OSAMPLE_0:
+  t_typ += 500 + (2000 << (pressure_mode - 1))
+  t_max += 575 + (2300 << (pressure_mode - 1))
+ if humidity_mode != OSAMPLE_0:
+  t_typ += 500 + (2000 << (humidity_mode - 1))
+  t_max += 575 + (2300 << (humidity_mode - 1))
+ return t_typ, t_max
+def _s16(b, i):
+ v = b[i] | (b[i + 1] << 8)
+ return v - 65536 if v > 32767 else v
+def _s8(v):
+ return v - 256 if v > 127 else v
 class BME280(object):
-
-    def __init__(self,
-                 temp_mode=2,
-                 pres_mode=5,
-                 humi_mode=1,
-                 temp_scale='C',
-                 iir=4,
-                 address=BME280_I2CADDR,
-                 i2c):
-        osamples = [0, 1, 2, 3, 4, 5]
-        msg_error = 'Unexpected {} operating mode value {0}.'
-        if temp_mode not in osamples:
-            raise ValueError(msg_error.format("temperature", temp_mode))
-        self.temp_mode = temp_mode
-        if pres_mode not in osamples:
-            raise ValueError(msg_error.format("pressure", pres_mode))
-        self.pres_mode = pres_mode
-        if humi_mode not in osamples:
-            raise ValueError(msg_error.format("humidity", humi_mode))
-        self.humi_mode = humi_mode
-        msg_error = 'Unexpected low pass IIR filter setting value {0}.'
-        if iir not in [0, 1, 2, 3, 4]:
-            raise ValueError(msg_error.format(iir))
-        self.iir = iir
-        msg_error = 'Unexpected temperature scale value {0}.'
-        if temp_scale not in ['C', 'F', 'K']:
-            raise ValueError(msg_error.format(temp_scale))
-        self.temp_scale = temp_scale
-        del msg_error
-        self.address = address
-        self.i2c = i2c
-        dig_88_a1 = self.i2c.readfrom_mem(self.address, 0x88, 26)
-        dig_e1_e7 = self.i2c.readfrom_mem(self.address, 0xE1, 7)
-        self.dig_T1, \
-        self.dig_T2, \
-        self.dig_T3, \
-        self.dig_P1, \
-        self.dig_P2, \
-        self.dig_P3, \
-        self.dig_P4, \
-        self.dig_P5, \
-        self.dig_P6, \
-        self.dig_P7, \
-        self.dig_P8, \
-        self.dig_P9, \
-        _, \
-        self.dig_H1 = unpack("<HhhHhhhhhhhhBB", dig_88_a1)
-        self.dig_H2, self.dig_H3 = unpack("<hB", dig_e1_e7)
-        e4_sign = unpack_from("<b", dig_e1_e7, 3)[0]
-        self.dig_H4 = (e4_sign << 4) | (dig_e1_e7[4] & 0xF)
-        e6_sign = unpack_from("<b", dig_e1_e7, 5)[0]
-        self.dig_H5 = (e6_sign << 4) | (dig_e1_e7[4] >> 4)
-        self.dig_H6 = unpack_from("<b", dig_e1_e7, 6)[0]
-        self.i2c.writeto_mem(
-            self.address,
-            0xF4,
-            bytearray([0x24]))
-        time.sleep(0.002)
-        self.t_fine = 0
-        self._l1_barray = bytearray(1)
-        self._l8_barray = bytearray(8)
-        self._l3_resultarray = array("i", [0, 0, 0])
-        self._l1_barray[0] = self.iir << 2
-        self.i2c.writeto_mem(self.address, 0xF5, self._l1_barray)
-        time.sleep(0.002)
-        self._l1_barray[0] = self.humi_mode
-        self.i2c.writeto_mem(self.address, 0xF2, self._l1_barray)
-
-    def read_raw_data(self, result):
-        self._l1_barray[0] = (self.pres_mode << 5 | self.temp_mode << 2 | 1)
-        self.i2c.writeto_mem(self.address, 0xF4, self._l1_barray)
-        osamples_1_16 = [1, 2, 3, 4, 5]
-        sleep_time = 1250
-        if self.temp_mode in osamples_1_16:
-            sleep_time += 2300*(1 << self.temp_mode)
-        if self.pres_mode in osamples_1_16:
-            sleep_time += 575 + (2300*(1 << self.pres_mode))
-        if self.humi_mode in osamples_1_16:
-            sleep_time += 575 + (2300*(1 << self.humi_mode))
-        time.sleep_us(sleep_time)
-        while (unpack('<H', self.i2c.readfrom_mem(
-                                self.address, 0xF3, 2))[0] & 0x08):
-            time.sleep(0.001)
-        self.i2c.readfrom_mem_into(self.address, 0xF7, self._l8_barray)
-        readout = self._l8_barray
-        raw_press = ((readout[0] << 16) | (readout[1] << 8) | readout[2]) >> 4
-        raw_temp = ((readout[3] << 16) | (readout[4] << 8) | readout[5]) >> 4
-        raw_hum = (readout[6] << 8) | readout[7]
-        result[0] = raw_temp
-        result[1] = raw_press
-        result[2] = raw_hum
-
-    def read_compensated_data(self, result=None):
-        self.read_raw_data(self._l3_resultarray)
-        raw_temp, raw_press, raw_hum = self._l3_resultarray
-        var1 = ((raw_temp >> 3) - (self.dig_T1 << 1)) * (self.dig_T2 >> 11)
-        var2 = (raw_temp >> 4) - self.dig_T1
-        var2 = var2 * ((raw_temp >> 4) - self.dig_T1)
-        var2 = ((var2 >> 12) * self.dig_T3) >> 14
-        self.t_fine = var1 + var2
-        temp = (self.t_fine * 5 + 128) >> 8
-        var1 = self.t_fine - 128000
-        var2 = var1 * var1 * self.dig_P6
-        var2 = var2 + ((var1 * self.dig_P5) << 17)
-        var2 = var2 + (self.dig_P4 << 35)
-        var1 = (((var1 * var1 * self.dig_P3) >> 8) +
-                ((var1 * self.dig_P2) << 12))
-        var1 = (((1 << 47) + var1) * self.dig_P1) >> 33
-        if var1 == 0:
-            pressure = 0
-        else:
-            p = 1048576 - raw_press
-            p = (((p << 31) - var2) * 3125) // var1
-            var1 = (self.dig_P9 * (p >> 13) * (p >> 13)) >> 25
-            var2 = (self.dig_P8 * p) >> 19
-            pressure = ((p + var1 + var2) >> 8) + (self.dig_P7 << 4)
-        h = self.t_fine - 76800
-        h = (((((raw_hum << 14) - (self.dig_H4 << 20) -
-                (self.dig_H5 * h)) + 16384)
-              >> 15) * (((((((h * self.dig_H6) >> 10) *
-                            (((h * self.dig_H3) >> 11) + 32768)) >> 10) +
-                          2097152) * self.dig_H2 + 8192) >> 14))
-        h = h - (((((h >> 15) * (h >> 15)) >> 7) * self.dig_H1) >> 4)
-        h = 0 if h < 0 else h
-        h = 419430400 if h > 419430400 else h
-        humidity = h >> 12
-        if result:
-            result[0] = temp
-            result[1] = pressure
-            result[2] = humidity
-            return result
-        return array("i", (temp, pressure, humidity))
-
-    @property
-    def values(self):
-        temp, pres, humi = self.read_compensated_data()
-        temp = temp/100
-        if self.temp_scale == 'F':
-            temp = 32 + (temp*1.8)
-        elif self.temp_scale == 'K':
-            temp = temp + 273.15
-        pres = pres/256
-        humi = humi/1024
-        return (temp, pres, humi)
-
-    @property
-    def formated_values(self):
-        t, p, h = self.values
-        temp = "{} "+self.temp_scale
-        return (temp.format(t), "{} Pa".format(p), "{} %".format(h))
-
-    @property
-    def temperature(self):
-        t, _, _ = self.values
-        return t
-
-    @property
-    def pressure(self):
-        _, p, _ = self.values
-        return p
-
-    @property
-    def pressure_precision(self):
-        _, p, _ = self.read_compensated_data()
-        pi = float(p // 256)
-        pd = (p % 256)/256
-        return (pi, pd)
-
-    @property
-    def humidity(self):
-        _, _, h = self.values
-        return h
-
-    def altitude(self, pressure_sea_level=1013.25):
-        pi, pd = self.pressure_precision
-        return 44330*(1-((float(pi+pd)/100)/pressure_sea_level)**(1/5.255))
+ def __init__(self,
+    temp_mode=2,
+    pres_mode=5,
+    humi_mode=1,
+    temp_scale='C',
+    iir=4,
+    address=BME280_I2CADDR,
+    i2c=None):
+  osamples = range(6)
+  msg_error = 'Unexpected {0} operating mode value {1}.'
+  if temp_mode not in osamples:
+   raise ValueError(msg_error.format("temperature", temp_mode))
+  if pres_mode not in osamples:
+   raise ValueError(msg_error.format("pressure", pres_mode))
+  if humi_mode not in osamples:
+   raise ValueError(msg_error.format("humidity", humi_mode))
+  if iir not in range(5):
+   raise ValueError(
+    'Unexpected low pass IIR filter setting value {0}.'.format(
+     iir))
+  if temp_scale not in ('C', 'F', 'K'):
+   raise ValueError(
+    'Unexpected temperature scale value {0}.'.format(temp_scale))
+  if i2c is None:
+   raise ValueError('An I2C object is required.')
+  self.temp_scale = temp_scale
+  self.temp_mode = temp_mode
+  self.pres_mode = pres_mode
+  self.humi_mode = humi_mode
+  self.address = address
+  self.i2c = i2c
+  self.t_fine = 0
+  self._l1_barray = bytearray(1)
+  self._l8_barray = bytearray(8)
+  self._l3_resultarray = array("i", [0, 0, 0])
+  self.iir = iir
+  c = self._read(0x88, 26)
+  e = self._read(0xE1, 7)
+  dig = (c[0] | (c[1] << 8), _s16(c, 2), _s16(c, 4),
+   c[6] | (c[7] << 8), _s16(c, 8), _s16(c, 10), _s16(c, 12),
+   _s16(c, 14), _s16(c, 16), _s16(c, 18), _s16(c, 20),
+   _s16(c, 22), c[25], _s16(e, 0), e[2],
+   (_s8(e[3]) << 4) | (e[4] & 0xF),
+   (_s8(e[5]) << 4) | (e[4] >> 4), _s8(e[6]))
+  (self.dig_T1, self.dig_T2, self.dig_T3,
+  self.dig_P1, self.dig_P2, self.dig_P3, self.dig_P4, self.dig_P5,
+  self.dig_P6, self.dig_P7, self.dig_P8, self.dig_P9,
+  self.dig_H1, self.dig_H2, self.dig_H3, self.dig_H4, self.dig_H5,
+  self.dig_H6) = dig
+  self._cal = calibration_table(*dig)
+  self._timing(temp_mode, pres_mode, humi_mode)
+  self._write8(0xF2, humi_mode)
+  self._write8(0xF4, 0x24)
+  self._write8(0xF5, iir << 2)
+ def _read(self, reg, n):
+  return self.i2c.readfrom_mem(self.address, reg, n)
+ def _write8(self, reg, dat):
+  self._l1_barray[0] = dat
+  self.i2c.writeto_mem(self.address, reg, self._l1_barray)
+ def _status(self):
+  self.i2c.readfrom_mem_into(self.address, 0xF3, self._l1_barray)
+  return self._l1_barray[0]
+ def _data(self):
+  self.i2c.readfrom_mem_into(self.address, 0xF7, self._l8_barray)
+  return self._l8_barray
+ def _timing(self, temp_mode, pres_mode, humi_mode):
+  self._trigger = pres_mode << 5 | temp_mode << 2 | 1
+  self._tt = measurement_time(temp_mode, pres_mode, humi_mode)[0]
+ def _measure(self, result):
+  self._write8(0xF4, self._trigger)
+  sleep_us(self._tt)
+  while self._status() & 0x08:
+   sleep_us(1000)
+  b = self._data()
+  result[0] = (b[3] << 16 | b[4] << 8 | b[5]) >> 4
+  result[1] = (b[0] << 16 | b[1] << 8 | b[2]) >> 4
+  result[2] = b[6] << 8 | b[7]
+ def read_raw_data(self, result):
+  self._measure(result)
+ def read_compensated_data(self, result=None):
+  raw = self._l3_resultarray
+  self.read_raw_data(raw)
+  if result is None:
+   result = array("i", [0, 0, 0])
+  self.t_fine = compensate(self._cal, raw[0], raw[1], raw[2], result)
+  return result
+ @property
+ def values(self):
+  temp, pres, humi = self.read_compensated_data()
+  temp = temp / 100
+  if self.temp_scale == 'F':
+   temp = 32 + (temp * 1.8)
+  elif self.temp_scale == 'K':
+   temp = temp + 273.15
+  return (temp, pres / 256, humi / 1024)
+ @property
+ def formated_values(self):
+  t, p, h = self.values
+  return ("{} ".format(t) + self.temp_scale, "{} Pa".format(p),
+    "{} %".format(h))
+ @property
+ def temperature(self):
+  return self.values[0]
+ @property
+ def pressure(self):
+  return self.values[1]
+ @property
+ def pressure_precision(self):
+  p = self.read_compensated_data()[1]
+  return (float(p // 256), (p % 256) / 256)
+ @property
+ def humidity(self):
+  return self.values[2]
+ def altitude(self, pressure_sea_level=1013.25):
+  pi, pd = self.pressure_precision
+  return 44330 * (1 - ((pi + pd) / 100 / pressure_sea_level) **
+      (1 / 5.255))
@@ -1,192 +1,299 @@
+# Generated from bme280_small.py.in by build.py --variants, do not edit.
 """
-MicroPython driver for BME280 Temperature, Pressure and Humidity, developer version, specific for BBC Micro:bit :
+MicroPython driver for BME280 Temperature, Pressure and Humidity, developer
+version, specific for BBC Micro:bit:
 https://github.com/neliogodoi/MicroPython-BME280
 Authors: Nelio Goncalves Godoi 2017, Roberto Colistete Jr 2017
 Based on the work by authors Paul Cunnane 2016, Peter Dahlebrg 2016
-Version: 0.1.0 @ 2018/06/21
+Version: 0.2.0
 """
 
-from microbit import sleep
+from utime import sleep_us
+from utime import ticks_us, ticks_diff
 
+BME280_I2CADDR = 0x77
 
-class BME280:
+# Same values as in bme280
+OSAMPLE_0 = 0
+CHANNEL_PRESSURE = 2
+CHANNEL_HUMIDITY = 4
+CHANNELS_ALL = 7
+
+
+def calibration_table(t1, t2, t3, p1, p2, p3, p4, p5, p6, p7, p8, p9,
+                      h1, h2, h3, h4, h5, h6):
+    """
+    Fold the calibration-only terms of the Bosch integer compensation into
+    the tuple consumed by compensate().
+    """
+    return (t1, t1 << 1, t2 >> 11, t3,
+            p1, p1 << 14, p2 << 12, p3, p4 << 35, p5 << 17, p6, p7 << 4,
+            p8, p9,
+            h1, h2, h3, h4 << 20, h5, h6)
+
+
+def compensate(cal, raw_temp, raw_press, raw_hum, result,
+               channels=CHANNELS_ALL):
+    """
+    Compensate one raw sample with a calibration_table() tuple. Fills
+    result with (temperature, pressure, humidity) and returns t_fine.
+    Channels missing from the CHANNEL_* mask are left at 0.
+    """
+    t1, t1_x2, t2_11, t3, \
+        p1, p1_14, p2_12, p3, p4_35, p5_17, p6, p7_4, p8, p9, \
+        h1, h2, h3, h4_20, h5, h6 = cal
+
+    var2 = (raw_temp >> 4) - t1
+    t_fine = (((raw_temp >> 3) - t1_x2) * t2_11 +
+              ((((var2 * var2) >> 12) * t3) >> 14))
+    result[0] = (t_fine * 5 + 128) >> 8
+
+    if channels & CHANNEL_PRESSURE:
+        var1 = t_fine - 128000
+        var2 = var1 * var1 * p6 + var1 * p5_17 + p4_35
+        var1 = ((var1 * var1 * p3) >> 8) + var1 * p2_12
+        # Same as (((1 << 47) + var1) * dig_P1) >> 33 and
+        # (((p << 31) - var2) * 3125) // var1, split so no intermediate
+        # leaves the small int range of 64-bit ports
+        var1 = p1_14 + ((var1 * p1) >> 33)
+        if var1 == 0:
+            result[1] = 0
+        else:
+            # no divmod: its result tuple is a heap allocation per read
+            x = ((1048576 - raw_press) << 31) - var2
+            p = x // var1
+            p = p * 3125 + ((x - p * var1) * 3125) // var1
+            result[1] = (((p + ((p9 * (p >> 13) * (p >> 13)) >> 25) +
+                           ((p8 * p) >> 19)) >> 8) + p7_4)
+    else:
+        result[1] = 0
+
+    if channels & CHANNEL_HUMIDITY:
+        h = t_fine - 76800
+        h = (((((raw_hum << 14) - h4_20 - (h5 * h)) + 16384) >> 15) *
+             (((((((h * h6) >> 10) * (((h * h3) >> 11) + 32768)) >> 10) +
+                2097152) * h2 + 8192) >> 14))
+        h = h - (((((h >> 15) * (h >> 15)) >> 7) * h1) >> 4)
+        if h < 0:
+            h = 0
+        elif h > 419430400:
+            h = 419430400
+        result[2] = h >> 12
+    else:
+        result[2] = 0
+    return t_fine
+
+
+def measurement_time(temperature_mode, pressure_mode, humidity_mode):
     """
-    Class Driver for BME280 Temperature, Pressure and Humidity digital sensor
+    Typical and maximum measurement time in us for the OSAMPLE_* settings
+    (datasheet appendix B)
     """
-    
-    def __init__(self,
-                 i2c,          # I2C Object
-                 temp_mode=2,  # mode of operation for Temperature sensor
-                 pres_mode=5,  # mode of operation for Pressure sensor
-                 humi_mode=1,  # mode of operation for Humidity sensor
-                 iir=4,        # LOW PASS IIR FILTER SETTING
-                 address=0x77):# I2C address of sensor
-
-        # For default values x2 temperature, x16 pressure and
-        # x1 humidity oversampling, IIR filter x16 :
-        # Maximum measurement time =  t_measured,
-        # max= ((1.25 + (2.3*2)+(2.3*16 + 0.575)+(2.3*1 + 0.575))ms = 46,1ms
-        # Filter bandwidth response time = 22 samples
-        # to reach 75% of step response x 46,1 ms = 1.0142 s
+    t_typ = 1000
+    t_max = 1250
+    if temperature_mode != OSAMPLE_0:
+        t_typ += 2000 << (temperature_mode - 1)
+        t_max += 2300 << (temperature_mode - 1)
+    if pressure_mode != OSAMPLE_0:
+        t_typ += 500 + (2000 << (pressure_mode - 1))
+        t_max += 575 + (2300 << (pressure_mode - 1))
+    if humidity_mode != OSAMPLE_0:
+        t_typ += 500 + (2000 << (humidity_mode - 1))
+        t_max += 575 + (2300 << (humidity_mode - 1))
+    return t_typ, t_max
+
 
+def learn_wait(t_wait, t_typ, t_max, elapsed, polls):
+    """
+    Next wait in us before polling a forced conversion: towards the elapsed
+    time when the status had to be polled, creeping down when the first
+    poll found the conversion done; kept within 3/4 t_typ and t_max
+    """
+    if polls:
+        t_wait += (elapsed - t_wait) >> 2
+    else:
+        t_wait -= t_wait >> 5
+    if t_wait < (t_typ * 3) >> 2:
+        return (t_typ * 3) >> 2
+    if t_wait > t_max:
+        return t_max
+    return t_wait
+
+
+def parse_readout(readout, base, channels, result):
+    """
+    Fill result with the raw temperature, pressure and humidity words of a
+    data register burst read, where readout[base] is register 0xF7 (base is
+    -3 for a read from 0xFA). Channels missing from the CHANNEL_* mask get
+    the chip's skip values.
+    """
+    result[0] = ((readout[base + 3] << 16) | (readout[base + 4] << 8) |
+                 readout[base + 5]) >> 4
+    if channels & CHANNEL_PRESSURE:
+        result[1] = ((readout[base] << 16) | (readout[base + 1] << 8) |
+                     readout[base + 2]) >> 4
+    else:
+        result[1] = 0x80000
+    if channels & CHANNEL_HUMIDITY:
+        result[2] = (readout[base + 6] << 8) | readout[base + 7]
+    else:
+        result[2] = 0x8000
+
+
+
+def _s16(b, i):
+    v = b[i] | (b[i + 1] << 8)
+    return v - 65536 if v > 32767 else v
+
+
+def _s8(v):
+    return v - 256 if v > 127 else v
+
+
+class BME280(object):
+    """
+    Driver for the BME280 in forced mode: every read triggers one conversion
+    """
+
+    def __init__(self, i2c, temp_mode=2, pres_mode=5, humi_mode=1, iir=4,
+                 address=BME280_I2CADDR):
         self.temp_mode = temp_mode
         self.pres_mode = pres_mode
         self.humi_mode = humi_mode
-        self.iir = iir
         self.address = address
         self._i2c = i2c
         self._t_fine = 0
+        self._reg = bytearray(1)
+        self._wbuf = bytearray(2)
+        self._result = [0, 0, 0]
+        self.iir = iir
+        # calibration: burst reads of 0x88..0xA1 and 0xE1..0xE7
+        c = self._read(0x88, 26)
+        e = self._read(0xE1, 7)
+        dig = (c[0] | (c[1] << 8), _s16(c, 2), _s16(c, 4),
+               c[6] | (c[7] << 8), _s16(c, 8), _s16(c, 10), _s16(c, 12),
+               _s16(c, 14), _s16(c, 16), _s16(c, 18), _s16(c, 20),
+               _s16(c, 22), c[25], _s16(e, 0), e[2],
+               # 0xE4/0xE6 hold the signed upper bits, 0xE5 the lower
+               # nibbles
+               (_s8(e[3]) << 4) | (e[4] & 0xF),
+               (_s8(e[5]) << 4) | (e[4] >> 4), _s8(e[6]))
+        (self.dig_T1, self.dig_T2, self.dig_T3,
+         self.dig_P1, self.dig_P2, self.dig_P3, self.dig_P4, self.dig_P5,
+         self.dig_P6, self.dig_P7, self.dig_P8, self.dig_P9,
+         self.dig_H1, self.dig_H2, self.dig_H3, self.dig_H4, self.dig_H5,
+         self.dig_H6) = dig
+        self._cal = calibration_table(*dig)
+        # For the default x2 temperature, x16 pressure and x1 humidity
+        # oversampling a conversion takes 40 ms typical, 46.1 ms maximum;
+        # the x16 IIR filter reaches 75% of a step after 22 samples
+        self._timing(temp_mode, pres_mode, humi_mode)
+        # ctrl_hum takes effect with the next ctrl_meas write; config is
+        # only written reliably in sleep mode
+        self._write8(0xF2, humi_mode)
+        self._write8(0xF4, 0x24)
+        self._write8(0xF5, iir << 2)
 
-        # load calibration data
-        self.dig_T1 = self._read16(0x88)
-        self.dig_T2 = self._short(self._read16(0x8A))
-        self.dig_T3 = self._short(self._read16(0x8C))
-        self.dig_P1 = self._read16(0x8E)
-        self.dig_P2 = self._short(self._read16(0x90))
-        self.dig_P3 = self._short(self._read16(0x92))
-        self.dig_P4 = self._short(self._read16(0x94))
-        self.dig_P5 = self._short(self._read16(0x96))
-        self.dig_P6 = self._short(self._read16(0x98))
-        self.dig_P7 = self._short(self._read16(0x9A))
-        self.dig_P8 = self._short(self._read16(0x9C))
-        self.dig_P9 = self._short(self._read16(0x9E))
-        self.dig_H1 = self._read8(0xA1)
-        self.dig_H2 = self._short(self._read16(0xE1))
-        self.dig_H3 = self._read8(0xE3)
-        a = self._read8(0xE5)
-        self.dig_H4 = (self._read8(0xE4) << 4) + (a % 16)
-        self.dig_H5 = (self._read8(0xE6) << 4) + (a >> 4)
-        self.dig_H6 = self._read8(0xE7)
-        if self.dig_H6 > 127:
-            self.dig_H6 -= 256
-        # Configure oversampling of humidity sensor
-        self._write8(0xF2, self.humi_mode)
-        sleep(0.002)
-        self._write8(0xF4, 0x24) # 0x24 normal mode operation 
-                                 # 0x00 sleep  mode operation
-        # Sleep mode with temperature and pressure with 1x oversampling
-        sleep(0.002)
-        # Configure low pass IIR filter
-        self._write8(0xF5, self.iir << 2)
-
-    def _read8(self, reg):
-        """
-        Reads one bytes from the sensor
-        """
-        self._i2c.write(self.address, bytearray([reg]))
-        t = self._i2c.read(self.address, 1)
-        return t[0]
-
-    def _read16(self, reg):
-        """
-        Reads two byte from the sensor
-        """
-        self._i2c.write(self.address, bytearray([reg]))
-        t = self._i2c.read(self.address, 2)
-        return t[0]+t[1]*256
+    def _read(self, reg, n):
+        """
+        Burst reads n bytes from the sensor, starting at reg
+        """
+        self._reg[0] = reg
+        self._i2c.write(self.address, self._reg)
+        return self._i2c.read(self.address, n)
 
     def _write8(self, reg, dat):
+        self._wbuf[0] = reg
+        self._wbuf[1] = dat
+        self._i2c.write(self.address, self._wbuf)
+
+    def _status(self):
+        return self._read(0xF3, 1)[0]
+
+    def _data(self):
+        return self._read(self._start, self._n)
+
+    def _timing(self, temp_mode, pres_mode, humi_mode):
         """
-        Write one byte in sensor
+        Forced mode trigger, typical and maximum conversion time, and the
+        data registers to read: a channel with oversampling 0 is neither
+        read nor compensated
         """
-        self._i2c.write(self.address, bytearray([reg, dat]))
+        self._trigger = pres_mode << 5 | temp_mode << 2 | 1
+        self._tt, self._tm = measurement_time(temp_mode, pres_mode, humi_mode)
+        self._tw = self._tt
+        # pressure 0xF7..0xF9, temperature 0xFA..0xFC, humidity 0xFD..0xFE
+        ch = 1
+        start = 0xFA
+        end = 0xFD
+        if pres_mode:
+            ch |= CHANNEL_PRESSURE
+            start = 0xF7
+        if humi_mode:
+            ch |= CHANNEL_HUMIDITY
+            end = 0xFF
+        self._ch = ch
+        self._start = start
+        self._n = end - start
 
-    def _short(self, dat):
-        return [dat-65536, dat][dat > 32767] #if-else
+    def _measure(self, result):
+        """
+        Triggers a forced conversion, waits the time learned for this device,
+        polls the measuring bit with a backoff of up to 1 ms and fills
+        result with the raw temperature, pressure and humidity
+        """
+        self._write8(0xF4, self._trigger)
+        t0 = ticks_us()
+        sleep_us(self._tw)
+        n = 0
+        b = 100
+        while self._status() & 0x08:
+            n += 1
+            sleep_us(b)
+            b = min(b << 1, 1000)
+        self._tw = learn_wait(self._tw, self._tt, self._tm,
+                              ticks_diff(ticks_us(), t0), n)
+        # the read starts at 0xF7, or at 0xFA without pressure
+        parse_readout(self._data(), 0xF7 - self._start, self._ch, result)
 
     def read_raw_data(self):
         """
         Reads raw data from the sensor
         """
-        # Configure oversampling of pressure and temperature sensors,
-        # enter forced mode (needed for every reading)
-        self._write8(0xF4, (self.pres_mode << 5 | self.temp_mode << 2 | 1))
-
-        sleep_time = 1250
-        if self.temp_mode in [1, 2, 3, 4, 5]:
-            sleep_time += 2300*(1 << self.temp_mode)
-        if self.pres_mode in [1, 2, 3, 4, 5]:
-            sleep_time += 575 + (2300*(1 << self.pres_mode))
-        if self.humi_mode in [1, 2, 3, 4, 5]:
-            sleep_time += 575 + (2300*(1 << self.humi_mode))
-        # Wait the required for max measurement time
-        sleep(sleep_time/1000000) 
-
-        while(self._read16(0xF3) & 0x08):
-            sleep(0.001)
-        # burst readout from 0xF7 to 0xFE, recommended by datasheet
-        # pressure(0xF7): ((msb << 16) | (lsb << 8) | xlsb) >> 4
-        raw_pres = ((self._read8(0xF7)<<16) | (self._read8(0xF8)<<8) | self._read8(0xF9))>>4
-        # temperature(0xFA): ((msb << 16) | (lsb << 8) | xlsb) >> 4
-        raw_temp = ((self._read8(0xFA)<<16) | (self._read8(0xFB)<<8) | self._read8(0xFC))>>4
-        # humidity(0xFD): (msb << 8) | lsb
-        raw_humi = (self._read8(0xFD) << 8) | self._read8(0xFE)
-
-        return (raw_temp, raw_pres, raw_humi)
+        r = self._result
+        self._measure(r)
+        return (r[0], r[1], r[2])
 
     def read_compensated_data(self):
         """
         Compensates raw sensor data
         """
-        raw_temp, raw_press, raw_hum = self.read_raw_data()
-        # Temperature
-        var1 = ((raw_temp >> 3) - (self.dig_T1 << 1)) * (self.dig_T2 >> 11)
-        var2 = (raw_temp >> 4) - self.dig_T1
-        var2 = var2 * ((raw_temp >> 4) - self.dig_T1)
-        var2 = ((var2 >> 12) * self.dig_T3) >> 14
-
-        self._t_fine = var1 + var2
-        temp = (self._t_fine * 5 + 128) >> 8
-        # Pressure
-        var1 = self._t_fine - 128000
-        var2 = var1 * var1 * self.dig_P6
-        var2 = var2 + ((var1 * self.dig_P5) << 17)
-        var2 = var2 + (self.dig_P4 << 35)
-        var1 = (((var1 * var1 * self.dig_P3) >> 8) +
-                ((var1 * self.dig_P2) << 12))
-        var1 = (((1 << 47) + var1) * self.dig_P1) >> 33
-        if var1 == 0:
-            pres = 0
-        else:
-            p = 1048576 - raw_press
-            p = (((p << 31) - var2) * 3125) // var1
-            var1 = (self.dig_P9 * (p >> 13) * (p >> 13)) >> 25
-            var2 = (self.dig_P8 * p) >> 19
-            pres = ((p + var1 + var2) >> 8) + (self.dig_P7 << 4)
-        # Humidity
-        h = self._t_fine - 76800
-        h = (((((raw_hum << 14) - (self.dig_H4 << 20) -
-                (self.dig_H5 * h)) + 16384)
-              >> 15) * (((((((h * self.dig_H6) >> 10) *
-                            (((h * self.dig_H3) >> 11) + 32768)) >> 10) +
-                          2097152) * self.dig_H2 + 8192) >> 14))
-        h = h - (((((h >> 15) * (h >> 15)) >> 7) * self.dig_H1) >> 4)
-        h = 0 if h < 0 else h
-        h = 419430400 if h > 419430400 else h
-        humi = h >> 12
-
-        return (temp, pres, humi)
+        r = self._result
+        self._measure(r)
+        # compensate() reads its raw arguments before writing r
+        self._t_fine = compensate(self._cal, r[0], r[1], r[2], r, self._ch)
+        return (r[0], r[1], r[2])
 
     def values(self):
         """
-        Returns 3 double values for Temperature, Pressure and Humidity in this order
+        Returns 3 double values for Temperature, Pressure and Humidity in
+        this order
         """
         temp, pres, humi = self.read_compensated_data()
-        return (temp/100, pres/256,  humi/1024)
+        return (temp / 100, pres / 256, humi / 1024)
 
     def pressure_precision(self):
         """
-        Returns 2 double values for integer and decimal parts of Pressure in this order
+        Returns 2 double values for integer and decimal parts of Pressure in
+        this order
         """
         p = self.read_compensated_data()[1]
-        pi = float(p // 256)
-        pd = (p % 256)/256
-        return (pi, pd)
+        return (float(p // 256), (p % 256) / 256)
 
     def altitude(self, pressure_sea_level=1013.25):
         """
         Returns estimated altitude based on International Barometric Formula
         """
-        # The International Barometric Formula using hPa.
         pi, pd = self.pressure_precision()
-        return 44330*(1-((float(pi+pd)/100)/pressure_sea_level)**(1/5.255))
+        return 44330 * (1 - ((pi + pd) / 100 / pressure_sea_level) **
+                        (1 / 5.255))
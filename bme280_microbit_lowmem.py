@@ -1,123 +1,138 @@
-""" https://bit.ly/2yJwysL """
-from microbit import sleep
-
-class BME280:
-
-    def __init__(self, i2c, t_mode=2, p_mode=5, h_mode=1, iir=4, address=0x77):
-        self.t_mode = t_mode
-        self.p_mode = p_mode
-        self.h_mode = h_mode
-        self.iir = iir
-        self.addr = address
-        self._i2c = i2c
-        self._t_fine = 0
-        self._T1 = self._read16(0x88)
-        self._T2 = self._short(self._read16(0x8A))
-        self._T3 = self._short(self._read16(0x8C))
-        self._P1 = self._read16(0x8E)
-        self._P2 = self._short(self._read16(0x90))
-        self._P3 = self._short(self._read16(0x92))
-        self._P4 = self._short(self._read16(0x94))
-        self._P5 = self._short(self._read16(0x96))
-        self._P6 = self._short(self._read16(0x98))
-        self._P7 = self._short(self._read16(0x9A))
-        self._P8 = self._short(self._read16(0x9C))
-        self._P9 = self._short(self._read16(0x9E))
-        self._H1 = self._read8(0xA1)
-        self._H2 = self._short(self._read16(0xE1))
-        self._H3 = self._read8(0xE3)
-        a = self._read8(0xE5)
-        self._H4 = (self._read8(0xE4)<<4)+(a%16)
-        self._H5 = (self._read8(0xE6)<<4)+(a>>4)
-        self._H6 = self._read8(0xE7)
-        if self._H6 > 127:
-            self._H6 -= 256
-        self._write8(0xF2, self.h_mode)
-        sleep(0.002)
-        self._write8(0xF4, 0x24)
-        sleep(0.002)
-        self._write8(0xF5, self.iir<<2)
-
-    def _read8(self, reg):
-        self._i2c.write(self.addr, bytearray([reg]))
-        t = self._i2c.read(self.addr, 1)
-        return t[0]
-
-    def _read16(self, reg):
-        self._i2c.write(self.addr, bytearray([reg]))
-        t = self._i2c.read(self.addr, 2)
-        return t[0]+t[1]*256
-
-    def _write8(self, reg, dat):
-        self._i2c.write(self.addr, bytearray([reg, dat]))
-
-    def _short(self, dat):
-        if dat > 32767:
-            return dat - 65536
-        else:
-            return dat
-
-    def read_raw_data(self):
-        self._write8(0xF4, (self.p_mode << 5 | self.t_mode << 2 | 1))
-        sleep_time = 1250
-        if self.t_mode in [1, 2, 3, 4, 5]:
-            sleep_time += 2300*(1<< self.t_mode)
-        if self.p_mode in [1, 2, 3, 4, 5]:
-            sleep_time += 575+(2300*(1<<self.p_mode))
-        if self.h_mode in [1, 2, 3, 4, 5]:
-            sleep_time += 575+(2300*(1<<self.h_mode))
-        sleep(sleep_time/1000000)
-        while(self._read16(0xF3) & 0x08):
-            sleep(0.001)
-        raw_p = ((self._read8(0xF7)<<16)|(self._read8(0xF8)<<8)|self._read8(0xF9))>>4
-        raw_t = ((self._read8(0xFA)<<16)|(self._read8(0xFB)<<8)|self._read8(0xFC))>>4
-        raw_h = (self._read8(0xFD) << 8)| self._read8(0xFE)
-        return (raw_t, raw_p, raw_h)
-
-    def read_compensated_data(self):
-        raw_t, raw_p, raw_h = self.read_raw_data()
-        var1 = ((raw_t>>3)-(self._T1<<1))*(self._T2>>11)
-        var2 = (raw_t >> 4)-self._T1
-        var2 = var2*((raw_t>>4)-self._T1)
-        var2 = ((var2>>12)*self._T3)>>14
-        self._t_fine = var1+var2
-        temp = (self._t_fine*5+128)>>8
-        var1 = self._t_fine-128000
-        var2 = var1*var1*self._P6
-        var2 = var2+((var1*self._P5)<<17)
-        var2 = var2+(self._P4<<35)
-        var1 = (((var1*var1*self._P3)>>8)+
-                ((var1*self._P2)<<12))
-        var1 = (((1<<47)+var1)*self._P1)>>33
-        if var1 == 0:
-            pres = 0
-        else:
-            p = ((((1048576-raw_p)<<31)-var2)*3125)//var1
-            var1 = (self._P9*(p>>13)*(p >> 13))>>25
-            var2 = (self._P8*p)>>19
-            pres = ((p+var1+var2)>>8)+(self._P7<<4)
-        h = self._t_fine-76800
-        h = (((((raw_h<<14)-(self._H4<<20)-
-                (self._H5*h))+16384)
-              >>15)*(((((((h*self._H6)>>10)*
-                            (((h*self._H3)>>11)+32768))>>10)+
-                          2097152)*self._H2+8192)>>14))
-        h = h-(((((h>>15)*(h>>15))>>7)*self._H1)>>4)
-        h = 0 if h < 0 else h
-        h = 419430400 if h>419430400 else h
-        humi = h>>12
-        return (temp, pres, humi)
-
-    def values(self):
-        temp, pres, humi = self.read_compensated_data()
-        return (temp/100, pres/256,  humi/1024)
-
-    def pressure_precision(self):
-        p = self.read_compensated_data()[1]
-        pi = float(p // 256)
-        pd = (p % 256)/256
-        return (pi, pd)
-
-    def altitude(self, pressure_sea_level=1013.25):
-        pi, pd = self.pressure_precision()
-        return 44330*(1-((float(pi+pd)/100)/pressure_sea_level)**(1/5.255))
+# Generated from bme280_small.py.in by build.py --variants, do not edit.
+from utime import sleep_us
+BME280_I2CADDR = 0x77
+OSAMPLE_0 = 0
+CHANNEL_PRESSURE = 2
+CHANNEL_HUMIDITY = 4
+CHANNELS_ALL = 7
+def calibration_table(t1, t2, t3, p1, p2, p3, p4, p5, p6, p7, p8, p9,
+     h1, h2, h3, h4, h5, h6):
+ return (t1, t1 << 1, t2 >> 11, t3,
+   p1, p1 << 14, p2 << 12, p3, p4 << 35, p5 << 17, p6, p7 << 4,
+   p8, p9,
+   h1, h2, h3, h4 << 20, h5, h6)
+def compensate(cal, raw_temp, raw_press, raw_hum, result,
+   channels=CHANNELS_ALL):
+ t1, t1_x2, t2_11, t3, \
+  p1, p1_14, p2_12, p3, p4_35, p5_17, p6, p7_4, p8, p9, \
+  h1, h2, h3, h4_20, h5, h6 = cal
+ var2 = (raw_temp >> 4) - t1
+ t_fine = (((raw_temp >> 3) - t1_x2) * t2_11 +
+   ((((var2 * var2) >> 12) * t3) >> 14))
+ result[0] = (t_fine * 5 + 128) >> 8
+ if channels & CHANNEL_PRESSURE:
+  var1 = t_fine - 128000
+  var2 = var1 * var1 * p6 + var1 * p5_17 + p4_35
+  var1 = ((var1 * var1 * p3) >> 8) + var1 * p2_12
+  var1 = p1_14 + ((var1 * p1) >> 33)
+  if var1 == 0:
+   result[1] = 0
+  else:
+   x = ((1048576 - raw_press) << 31) - var2
+   p = x // var1
+   p = p * 3125 + ((x - p * var1) * 3125) // var1
+   result[1] = (((p + ((p9 * (p >> 13) * (p >> 13)) >> 25) +
+      ((p8 * p) >> 19)) >> 8) + p7_4)
+ else:
+  result[1] = 0
+ if channels & CHANNEL_HUMIDITY:
+  h = t_fine - 76800
+  h = (((((raw_hum << 14) - h4_20 - (h5 * h)) + 16384) >> 15) *
+   (((((((h * h6) >> 10) * (((h * h3) >> 11) + 32768)) >> 10) +
+    2097152) * h2 + 8192) >> 14))
+  h = h - (((((h >> 15) * (h >> 15)) >> 7) * h1) >> 4)
+  if h < 0:
+   h = 0
+  elif h > 419430400:
+   h = 419430400
+  result[2] = h >> 12
+ else:
+  result[2] = 0
+ return t_fine
+def measurement_time(temperature_mode, pressure_mode, humidity_mode):
+ t_typ = 1000
+ t_max = 1250
+ if temperature_mode != OSAMPLE_0:
+  t_typ += 2000 << (temperature_mode - 1)
+  t_max += 2300 << (temperature_mode - 1)
+ if pressure_mode != OSAMPLE_0:
+  t_typ += 500 + (2000 << (pressure_mode - 1))
+  t_max += 575 + (2300 << (pressure_mode - 1))
+ if humidity_mode != OSAMPLE_0:
+  t_typ += 500 + (2000 << (humidity_mode - 1))
+  t_max += 575 + (2300 << (humidity_mode - 1))
+ return t_typ, t_max
+def _s16(b, i):
+ v = b[i] | (b[i + 1] << 8)
+ return v - 65536 if v > 32767 else v
+def _s8(v):
+ return v - 256 if v > 127 else v
+class BME280(object):
+ def __init__(self, i2c, t_mode=2, p_mode=5, h_mode=1, iir=4,
+    address=BME280_I2CADDR):
+  temp_mode = self.t_mode = t_mode
+  pres_mode = self.p_mode = p_mode
+  humi_mode = self.h_mode = h_mode
+  self.addr = address
+  self._i2c = i2c
+  self._t_fine = 0
+  self._reg = bytearray(1)
+  self._wbuf = bytearray(2)
+  self._result = [0, 0, 0]
+  self.iir = iir
+  c = self._read(0x88, 26)
+  e = self._read(0xE1, 7)
+  dig = (c[0] | (c[1] << 8), _s16(c, 2), _s16(c, 4),
+   c[6] | (c[7] << 8), _s16(c, 8), _s16(c, 10), _s16(c, 12),
+   _s16(c, 14), _s16(c, 16), _s16(c, 18), _s16(c, 20),
+   _s16(c, 22), c[25], _s16(e, 0), e[2],
+   (_s8(e[3]) << 4) | (e[4] & 0xF),
+   (_s8(e[5]) << 4) | (e[4] >> 4), _s8(e[6]))
+  self._cal = calibration_table(*dig)
+  self._timing(temp_mode, pres_mode, humi_mode)
+  self._write8(0xF2, humi_mode)
+  self._write8(0xF4, 0x24)
+  self._write8(0xF5, iir << 2)
+ def _read(self, reg, n):
+  self._reg[0] = reg
+  self._i2c.write(self.addr, self._reg)
+  return self._i2c.read(self.addr, n)
+ def _write8(self, reg, dat):
+  self._wbuf[0] = reg
+  self._wbuf[1] = dat
+  self._i2c.write(self.addr, self._wbuf)
+ def _status(self):
+  return self._read(0xF3, 1)[0]
+ def _data(self):
+  return self._read(0xF7, 8)
+ def _timing(self, temp_mode, pres_mode, humi_mode):
+  self._trigger = pres_mode << 5 | temp_mode << 2 | 1
+  self._tt = measurement_time(temp_mode, pres_mode, humi_mode)[0]
+ def _measure(self, result):
+  self._write8(0xF4, self._trigger)
+  sleep_us(self._tt)
+  while self._status() & 0x08:
+   sleep_us(1000)
+  b = self._data()
+  result[0] = (b[3] << 16 | b[4] << 8 | b[5]) >> 4
+  result[1] = (b[0] << 16 | b[1] << 8 | b[2]) >> 4
+  result[2] = b[6] << 8 | b[7]
+ def read_raw_data(self):
+  r = self._result
+  self._measure(r)
+  return (r[0], r[1], r[2])
+ def read_compensated_data(self):
+  r = self._result
+  self._measure(r)
+  self._t_fine = compensate(self._cal, r[0], r[1], r[2], r)
+  return (r[0], r[1], r[2])
+ def values(self):
+  temp, pres, humi = self.read_compensated_data()
+  return (temp / 100, pres / 256, humi / 1024)
+ def pressure_precision(self):
+  p = self.read_compensated_data()[1]
+  return (float(p // 256), (p % 256) / 256)
+ def altitude(self, pressure_sea_level=1013.25):
+  pi, pd = self.pressure_precision()
+  return 44330 * (1 - ((pi + pd) / 100 / pressure_sea_level) **
+      (1 / 5.255))
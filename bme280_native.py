@@ -0,0 +1,67 @@
+# Generated from bme280_native.py.in by build.py --variants, do not edit.
+"""
+Native-emitter build of bme280.compensate(), imported by bme280 when the
+port supports @micropython.native. Generated by build.py --variants from
+compensate() in bme280.py.
+"""
+
+import micropython
+from micropython import const
+
+# Same values as in bme280
+CHANNEL_PRESSURE = const(2)
+CHANNEL_HUMIDITY = const(4)
+CHANNELS_ALL = const(7)
+
+
+@micropython.native
+def compensate(cal, raw_temp, raw_press, raw_hum, result,
+               channels=CHANNELS_ALL):
+    """
+    Compensate one raw sample with a calibration_table() tuple. Fills
+    result with (temperature, pressure, humidity) and returns t_fine.
+    Channels missing from the CHANNEL_* mask are left at 0.
+    """
+    t1, t1_x2, t2_11, t3, \
+        p1, p1_14, p2_12, p3, p4_35, p5_17, p6, p7_4, p8, p9, \
+        h1, h2, h3, h4_20, h5, h6 = cal
+
+    var2 = (raw_temp >> 4) - t1
+    t_fine = (((raw_temp >> 3) - t1_x2) * t2_11 +
+              ((((var2 * var2) >> 12) * t3) >> 14))
+    result[0] = (t_fine * 5 + 128) >> 8
+
+    if channels & CHANNEL_PRESSURE:
+        var1 = t_fine - 128000
+        var2 = var1 * var1 * p6 + var1 * p5_17 + p4_35
+        var1 = ((var1 * var1 * p3) >> 8) + var1 * p2_12
+        # Same as (((1 << 47) + var1) * dig_P1) >> 33 and
+        # (((p << 31) - var2) * 3125) // var1, split so no intermediate
+        # leaves the small int range of 64-bit ports
+        var1 = p1_14 + ((var1 * p1) >> 33)
+        if var1 == 0:
+            result[1] = 0
+        else:
+            # no divmod: its result tuple is a heap allocation per read
+            x = ((1048576 - raw_press) << 31) - var2
+            p = x // var1
+            p = p * 3125 + ((x - p * var1) * 3125) // var1
+            result[1] = (((p + ((p9 * (p >> 13) * (p >> 13)) >> 25) +
+                           ((p8 * p) >> 19)) >> 8) + p7_4)
+    else:
+        result[1] = 0
+
+    if channels & CHANNEL_HUMIDITY:
+        h = t_fine - 76800
+        h = (((((raw_hum << 14) - h4_20 - (h5 * h)) + 16384) >> 15) *
+             (((((((h * h6) >> 10) * (((h * h3) >> 11) + 32768)) >> 10) +
+                2097152) * h2 + 8192) >> 14))
+        h = h - (((((h >> 15) * (h >> 15)) >> 7) * h1) >> 4)
+        if h < 0:
+            h = 0
+        elif h > 419430400:
+            h = 419430400
+        result[2] = h >> 12
+    else:
+        result[2] = 0
+    return t_fine
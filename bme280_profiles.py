@@ -0,0 +1,159 @@
+"""
+Operating profiles for bme280.BME280 from the datasheet recommendations
+(section 5.5) and an estimator of measurement time, output data rate,
+current, noise and response time for any configuration (appendix B).
+
+A profile is a tuple (mode, temperature_mode, pressure_mode,
+humidity_mode, iir, standby, period_ms); period_ms is the intended sample
+period in forced mode and None in normal mode.
+
+    bme280_profiles.apply(sensor, bme280_profiles.INDOOR_NAVIGATION)
+    bme280_profiles.estimate(*bme280_profiles.GAMING)
+    # {'measure_us': 11500, 'odr_hz': 83.3, 'current_ua': 593.3, ...}
+"""
+
+import bme280
+from bme280 import (MODE_FORCED, MODE_NORMAL, OSAMPLE_0, OSAMPLE_1,
+                    OSAMPLE_2, OSAMPLE_4, OSAMPLE_16, FILTER_OFF, FILTER_16,
+                    STANDBY_0_5)
+
+WEATHER = (MODE_FORCED, OSAMPLE_1, OSAMPLE_1, OSAMPLE_1, FILTER_OFF,
+           STANDBY_0_5, 60000)
+HUMIDITY = (MODE_FORCED, OSAMPLE_1, OSAMPLE_0, OSAMPLE_1, FILTER_OFF,
+            STANDBY_0_5, 1000)
+INDOOR_NAVIGATION = (MODE_NORMAL, OSAMPLE_2, OSAMPLE_16, OSAMPLE_1,
+                     FILTER_16, STANDBY_0_5, None)
+GAMING = (MODE_NORMAL, OSAMPLE_1, OSAMPLE_4, OSAMPLE_0, FILTER_16,
+          STANDBY_0_5, None)
+
+PROFILES = {
+    "weather": WEATHER,
+    "humidity": HUMIDITY,
+    "indoor_navigation": INDOOR_NAVIGATION,
+    "gaming": GAMING,
+}
+
+# t_standby in us by STANDBY_* code
+STANDBY_US = (500, 62500, 125000, 250000, 500000, 1000000, 10000, 20000)
+
+# Typical currents in uA (datasheet table 1)
+I_SLEEP = 0.1
+I_STANDBY = 0.2
+I_TEMPERATURE = 350
+I_PRESSURE = 714
+I_HUMIDITY = 340
+
+# Typical RMS noise (tables 11 and 12): pressure in Pa by pressure
+# oversampling and IIR filter, humidity in %RH by humidity oversampling
+PRESSURE_NOISE = ((3.3, 1.9, 1.2, 0.9, 0.4),
+                  (2.6, 1.5, 1.0, 0.6, 0.4),
+                  (2.1, 1.2, 0.8, 0.5, 0.3),
+                  (1.6, 1.0, 0.6, 0.4, 0.2),
+                  (1.3, 0.8, 0.5, 0.4, 0.2))
+HUMIDITY_NOISE = (0.07, 0.05, 0.04, 0.03, 0.02)
+
+# Samples to reach 75% of a step response by IIR filter (table 6)
+FILTER_STEP_SAMPLES = (1, 2, 5, 11, 22)
+
+
+def apply(sensor, profile):
+    """
+    Switch sensor to profile with a single register update; only the
+    registers that differ from the current ones are written.
+    """
+    mode, temperature_mode, pressure_mode, humidity_mode, iir, standby, _ = \
+        profile
+    sensor.configure(mode, temperature_mode, pressure_mode, humidity_mode,
+                     iir, standby)
+
+
+def estimate(mode, temperature_mode, pressure_mode, humidity_mode,
+             iir=FILTER_OFF, standby=STANDBY_0_5, period_ms=None):
+    """
+    Expected performance of a configuration, as a dict:
+
+        measure_us          typical measurement time
+        measure_max_us      maximum measurement time
+        odr_hz              output data rate: the highest forced rate,
+                            the normal mode rate, or 1000 / period_ms
+        current_ua          average supply current at odr_hz
+        pressure_noise_pa   RMS pressure noise (None without pressure)
+        humidity_noise_rh   RMS humidity noise (None without humidity)
+        response_ms         time to 75% of a step with the IIR filter
+    """
+    measure_us, measure_max_us = bme280.measurement_time(
+        temperature_mode, pressure_mode, humidity_mode)
+    if mode == MODE_NORMAL:
+        cycle_us = measure_us + STANDBY_US[standby]
+        idle_current = I_STANDBY
+    else:
+        cycle_us = measure_us
+        if period_ms and period_ms * 1000 > cycle_us:
+            cycle_us = period_ms * 1000
+        idle_current = I_SLEEP
+    # Startup counts as temperature conversion time
+    charge = 0
+    if temperature_mode != OSAMPLE_0:
+        charge += I_TEMPERATURE * (1000 + (2000 << (temperature_mode - 1)))
+    else:
+        charge += I_TEMPERATURE * 1000
+    if pressure_mode != OSAMPLE_0:
+        charge += I_PRESSURE * (500 + (2000 << (pressure_mode - 1)))
+    if humidity_mode != OSAMPLE_0:
+        charge += I_HUMIDITY * (500 + (2000 << (humidity_mode - 1)))
+    odr_hz = 1000000 / cycle_us
+    current_ua = (charge + idle_current * (cycle_us - measure_us)) / cycle_us
+    return {
+        "measure_us": measure_us,
+        "measure_max_us": measure_max_us,
+        "odr_hz": round(odr_hz, 3),
+        "current_ua": round(current_ua, 2),
+        "pressure_noise_pa": (PRESSURE_NOISE[pressure_mode - 1][iir]
+                              if pressure_mode != OSAMPLE_0 else None),
+        "humidity_noise_rh": (HUMIDITY_NOISE[humidity_mode - 1]
+                              if humidity_mode != OSAMPLE_0 else None),
+        "response_ms": round(FILTER_STEP_SAMPLES[iir] * 1000 / odr_hz, 1),
+    }
+
+
+def estimate_sensor(sensor, period_ms=None):
+    """ estimate() for the current settings of a bme280.BME280 """
+    return estimate(sensor.mode, sensor.temperature_mode,
+                    sensor.pressure_mode, sensor.humidity_mode, sensor.iir,
+                    sensor.standby, period_ms)
+
+
+def fastest(pressure_noise=None, humidity_noise=None, mode=MODE_NORMAL,
+            standby=STANDBY_0_5):
+    """
+    Profile with the shortest step response whose pressure and humidity
+    noise stay within the given RMS budgets (Pa, %RH). A channel without a
+    budget is skipped. Ties go to the lower current; None when no
+    configuration meets the budget.
+    """
+    best = None
+    best_key = None
+    pressure_modes = (range(1, 6) if pressure_noise is not None
+                      else (OSAMPLE_0,))
+    humidity_modes = (range(1, 6) if humidity_noise is not None
+                      else (OSAMPLE_0,))
+    for pressure_mode in pressure_modes:
+        # datasheet pairs x16 pressure with x2 temperature
+        temperature_mode = OSAMPLE_2 if pressure_mode == OSAMPLE_16 \
+            else OSAMPLE_1
+        for humidity_mode in humidity_modes:
+            for iir in range(FILTER_OFF, FILTER_16 + 1):
+                profile = (mode, temperature_mode, pressure_mode,
+                           humidity_mode, iir, standby, None)
+                e = estimate(*profile)
+                if (pressure_noise is not None and
+                        e["pressure_noise_pa"] > pressure_noise):
+                    continue
+                if (humidity_noise is not None and
+                        e["humidity_noise_rh"] > humidity_noise):
+                    continue
+                key = (e["response_ms"], e["current_ua"])
+                if best_key is None or key < best_key:
+                    best = profile
+                    best_key = key
+    return best
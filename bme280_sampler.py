@@ -0,0 +1,184 @@
+"""
+Background sampler for bme280.BME280: reads are scheduled from a
+machine.Timer callback through micropython.schedule (or from a thread on
+a Linux host) into a preallocated ring buffer the application drains in
+bulk.
+
+Put the sensor in MODE_NORMAL with a standby time shorter than the period
+so each scheduled read is only the 8-byte burst read.
+"""
+
+from array import array
+
+try:
+    from time import ticks_us, ticks_diff
+except ImportError:
+    from time import perf_counter
+
+    def ticks_us():
+        return int(perf_counter() * 1000000) & 0x3FFFFFFF
+
+    def ticks_diff(end, start):
+        return ((end - start + 0x20000000) & 0x3FFFFFFF) - 0x20000000
+
+try:
+    from micropython import schedule
+except ImportError:
+    schedule = None
+
+# Each record is (ticks_us, temperature, pressure, humidity)
+RECORD_SIZE = 4
+
+
+class RingBuffer(object):
+    """
+    Fixed capacity FIFO of records in one array('i'). The producer only
+    moves head and the consumer only moves tail, so one IRQ/thread may
+    push while another drains.
+    """
+
+    def __init__(self, capacity):
+        # One slot stays empty to tell a full buffer from an empty one
+        self._slots = capacity + 1
+        self._buf = array("i", [0]) * (self._slots * RECORD_SIZE)
+        self._head = 0
+        self._tail = 0
+        self.dropped = 0
+
+    def __len__(self):
+        return (self._head - self._tail) % self._slots
+
+    @property
+    def capacity(self):
+        return self._slots - 1
+
+    def push(self, ticks, sample):
+        head = self._head
+        next_head = head + 1
+        if next_head == self._slots:
+            next_head = 0
+        if next_head == self._tail:
+            self.dropped += 1
+            return False
+        buf = self._buf
+        i = head * RECORD_SIZE
+        buf[i] = ticks
+        buf[i + 1] = sample[0]
+        buf[i + 2] = sample[1]
+        buf[i + 3] = sample[2]
+        self._head = next_head
+        return True
+
+    def drain(self, out):
+        """
+        Move up to len(out) // RECORD_SIZE records into out and return how
+        many were copied.
+        """
+        buf = self._buf
+        tail = self._tail
+        head = self._head
+        count = 0
+        limit = len(out) // RECORD_SIZE
+        while tail != head and count < limit:
+            i = tail * RECORD_SIZE
+            j = count * RECORD_SIZE
+            out[j] = buf[i]
+            out[j + 1] = buf[i + 1]
+            out[j + 2] = buf[i + 2]
+            out[j + 3] = buf[i + 3]
+            count += 1
+            tail += 1
+            if tail == self._slots:
+                tail = 0
+        self._tail = tail
+        return count
+
+    def clear(self):
+        self._tail = self._head
+
+
+class Sampler(object):
+
+    def __init__(self, sensor, period_ms=40, capacity=64):
+        self.sensor = sensor
+        self.period_ms = period_ms
+        self.ring = RingBuffer(capacity)
+        self.max_jitter_us = 0
+        self._sample_buf = array("i", [0, 0, 0])
+        self._last_ticks = None
+        self._pending = False
+        self._timer = None
+        self._thread_running = False
+        # Bound methods allocate, so create them once outside the IRQ
+        self._sample_ref = self._sample
+        self._irq_ref = self._irq
+
+    @property
+    def dropped(self):
+        return self.ring.dropped
+
+    def start(self, timer=None):
+        """
+        Sample every period_ms. With a machine.Timer the timer callback
+        schedules the read; without one a host thread is started.
+        """
+        self._last_ticks = None
+        if timer is not None:
+            self._timer = timer
+            timer.init(period=self.period_ms, mode=timer.PERIODIC,
+                       callback=self._irq_ref)
+        else:
+            import threading
+            self._thread_running = True
+            self._thread = threading.Thread(target=self._run)
+            self._thread.daemon = True
+            self._thread.start()
+
+    def stop(self):
+        if self._timer is not None:
+            self._timer.deinit()
+            self._timer = None
+        if self._thread_running:
+            self._thread_running = False
+            self._thread.join()
+
+    def drain(self, out):
+        """ See RingBuffer.drain """
+        return self.ring.drain(out)
+
+    def _irq(self, timer):
+        # A read still waiting to run means the main loop is behind
+        if self._pending:
+            self.ring.dropped += 1
+            return
+        self._pending = True
+        try:
+            schedule(self._sample_ref, None)
+        except RuntimeError:
+            self._pending = False
+            self.ring.dropped += 1
+
+    def _run(self):
+        from time import sleep
+        period_us = self.period_ms * 1000
+        deadline = ticks_us()
+        while self._thread_running:
+            self._sample(None)
+            deadline = (deadline + period_us) & 0x3FFFFFFF
+            delay = ticks_diff(deadline, ticks_us())
+            if delay > 0:
+                sleep(delay / 1000000)
+
+    def _sample(self, _):
+        self._pending = False
+        now = ticks_us()
+        last = self._last_ticks
+        if last is not None:
+            jitter = ticks_diff(now, last) - self.period_ms * 1000
+            if jitter < 0:
+                jitter = -jitter
+            if jitter > self.max_jitter_us:
+                self.max_jitter_us = jitter
+        self._last_ticks = now
+        self.sensor.read_compensated_into(self._sample_buf)
+        self.ring.push(now, self._sample_buf)
@@ -0,0 +1,601 @@
+"""
+Register-level BME280 simulator for running the drivers under CPython.
+
+    import bme280_sim
+    clock = bme280_sim.VirtualClock()
+    bme280_sim.install(clock)            # MicroPython stand-ins, see install()
+    sensor = bme280_sim.SimulatedBME280(
+        clock=clock, environment=bme280_sim.sine(21.0, 3.0, 600.0))
+    i2c = bme280_sim.SimI2C(sensor)
+    import bme280
+    driver = bme280.BME280(i2c=i2c)
+
+The model covers the calibration NVM (0x88..0xA1, 0xE1..0xE7), chip id and
+soft reset, ctrl_hum latching on the next ctrl_meas write, config writes
+being ignored in normal mode, sleep/forced/normal modes with the datasheet
+typical measurement and standby times, the status measuring bit, skipped
+channels (0x80000/0x8000) and the IIR filter on temperature and pressure.
+Raw ADC words are found by inverting bme280.compensate(), so the drivers
+read back the environment the waveform describes. SimI2C and SimSPI put
+a sensor on an I2C or SPI bus.
+"""
+
+import contextlib
+import math
+import random
+import struct
+import sys
+import time
+import types
+
+import bme280
+
+# dig_T1..dig_T3, dig_P1..dig_P9, dig_H1..dig_H6
+DEFAULT_CALIBRATION = (27504, 26435, -1000,
+                       36477, -10685, 3024, 2855, 140, -7, 15500, -14600,
+                       6000,
+                       75, 362, 0, 313, 50, 30)
+
+CHIP_ID = 0x60
+# t_sb in seconds for config[7:5]
+STANDBY_TIMES = (0.0005, 0.0625, 0.125, 0.25, 0.5, 1.0, 0.010, 0.020)
+IIR_COEFFICIENTS = (1, 2, 4, 8, 16)
+
+REG_CHIP_ID = 0xD0
+REG_RESET = 0xE0
+REG_CTRL_HUM = 0xF2
+REG_STATUS = 0xF3
+REG_CTRL_MEAS = 0xF4
+REG_CONFIG = 0xF5
+WRITABLE = (REG_RESET, REG_CTRL_HUM, REG_CTRL_MEAS, REG_CONFIG)
+
+# At most this many normal-mode conversions are replayed after a long idle;
+# the IIR filter has settled long before.
+MAX_CATCH_UP = 64
+
+_TICKS_PERIOD = 1 << 30
+
+
+class VirtualClock(object):
+    """ Simulated time in seconds; sleeping advances it instantly """
+
+    def __init__(self, start=0.0):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            self.now += seconds
+
+
+class RealClock(object):
+
+    def __call__(self):
+        return time.perf_counter()
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            _real_sleep(seconds)
+
+
+_real_sleep = time.sleep
+
+
+def constant(temperature=21.0, pressure=101325.0, humidity=45.0):
+    """ Environment with fixed degC, Pa and %RH """
+    def environment(t):
+        return temperature, pressure, humidity
+    return environment
+
+
+def sine(temperature=21.0, amplitude=1.0, period=60.0,
+         pressure=101325.0, pressure_amplitude=50.0, humidity=45.0,
+         humidity_amplitude=5.0):
+    """ Environment oscillating around the given means with one period """
+    def environment(t):
+        s = math.sin(2 * math.pi * t / period)
+        return (temperature + amplitude * s,
+                pressure + pressure_amplitude * s,
+                humidity - humidity_amplitude * s)
+    return environment
+
+
+def step(before, after, at):
+    """ Environment switching from one (degC, Pa, %RH) triple to another """
+    def environment(t):
+        return after if t >= at else before
+    return environment
+
+
+def calibration_nvm(calibration):
+    """ Encode 18 dig_* values as the 0x88..0xA1 and 0xE1..0xE7 blocks """
+    t1, t2, t3, p1, p2, p3, p4, p5, p6, p7, p8, p9, \
+        h1, h2, h3, h4, h5, h6 = calibration
+    block_88 = struct.pack("<HhhHhhhhhhhhBB", t1, t2, t3, p1, p2, p3, p4,
+                           p5, p6, p7, p8, p9, 0, h1)
+    block_e1 = struct.pack("<hBbBbb", h2, h3, h4 >> 4,
+                           (h4 & 0xF) | ((h5 & 0xF) << 4), h5 >> 4, h6)
+    return block_88, block_e1
+
+
+def typical_measurement_time(osrs_t, osrs_p, osrs_h):
+    """ Datasheet typical measurement time in seconds """
+    t = 1000
+    if osrs_t:
+        t += 2000 << (min(osrs_t, 5) - 1)
+    if osrs_p:
+        t += 500 + (2000 << (min(osrs_p, 5) - 1))
+    if osrs_h:
+        t += 500 + (2000 << (min(osrs_h, 5) - 1))
+    return t / 1000000
+
+
+class SimulatedBME280(object):
+    """
+    One simulated sensor. It answers the bme280 bus protocol
+    (read_into/write) directly and the I2C APIs through SimI2C.
+
+    environment(t) returns (degC, Pa, %RH) at clock time t. noise is the
+    rms noise at x1 oversampling as (degC, Pa, %RH); it shrinks with the
+    square root of the oversampling. conversion_scale stretches the typical
+    conversion time to mimic part-to-part spread.
+    """
+
+    def __init__(self, address=0x76, calibration=DEFAULT_CALIBRATION,
+                 environment=None, clock=None, noise=(0.0, 0.0, 0.0),
+                 conversion_scale=1.0, seed=None):
+        self.address = address
+        self.calibration = calibration
+        self.environment = environment or constant()
+        self.clock = clock or RealClock()
+        self.noise = noise
+        self.conversion_scale = conversion_scale
+        self.conversions = 0
+        self._random = random.Random(seed)
+        self._cal = bme280.calibration_table(*calibration)
+        self._nvm_88, self._nvm_e1 = calibration_nvm(calibration)
+        self.reset()
+
+    def reset(self):
+        regs = bytearray(256)
+        regs[0x88:0x88 + 26] = self._nvm_88
+        regs[0xE1:0xE1 + 7] = self._nvm_e1
+        regs[REG_CHIP_ID] = CHIP_ID
+        self.registers = regs
+        self._osrs_h = 0
+        self._filter_t = None
+        self._filter_p = None
+        self._busy_until = None
+        self._cycle_start = None
+        self._cycles_done = 0
+        self._store_result(0x80000, 0x80000, 0x8000)
+
+    # Register access
+
+    def read_into(self, register, buf):
+        self._update()
+        regs = self.registers
+        for i in range(len(buf)):
+            reg = register + i
+            buf[i] = regs[reg] if reg < 256 else 0
+
+    def read(self, register, nbytes):
+        buf = bytearray(nbytes)
+        self.read_into(register, buf)
+        return bytes(buf)
+
+    def write(self, register, buf):
+        for i in range(len(buf)):
+            self.write_register(register + i, buf[i])
+
+    def write_register(self, register, value):
+        self._update()
+        if register not in WRITABLE:
+            return
+        if register == REG_RESET:
+            if value == 0xB6:
+                self.reset()
+            return
+        mode = self.registers[REG_CTRL_MEAS] & 0x03
+        if register == REG_CONFIG and mode == 3:
+            return
+        if register == REG_CONFIG and \
+                (value ^ self.registers[REG_CONFIG]) & 0x1C:
+            # A new filter coefficient restarts the filter
+            self._filter_t = self._filter_p = None
+        self.registers[register] = value
+        if register == REG_CTRL_MEAS:
+            self._start(value & 0x03)
+
+    # Measurement model
+
+    @property
+    def measuring(self):
+        self._update()
+        return bool(self.registers[REG_STATUS] & 0x08)
+
+    def measurement_time(self):
+        ctrl_meas = self.registers[REG_CTRL_MEAS]
+        return self.conversion_scale * typical_measurement_time(
+            (ctrl_meas >> 2) & 0x07, ctrl_meas >> 5, self._osrs_h)
+
+    def _start(self, mode):
+        # ctrl_hum only takes effect with this ctrl_meas write
+        self._osrs_h = self.registers[REG_CTRL_HUM] & 0x07
+        now = self.clock()
+        if mode in (1, 2):
+            self._cycle_start = None
+            self._busy_until = now + self.measurement_time()
+            self.registers[REG_STATUS] |= 0x08
+        elif mode == 3:
+            self._busy_until = None
+            self._cycle_start = now
+            self._cycles_done = 0
+            self.registers[REG_STATUS] |= 0x08
+        else:
+            self._busy_until = None
+            self._cycle_start = None
+            self.registers[REG_STATUS] &= ~0x08
+
+    def _update(self):
+        now = self.clock()
+        regs = self.registers
+        if self._busy_until is not None:
+            if now >= self._busy_until:
+                self._convert(self._busy_until)
+                self._busy_until = None
+                regs[REG_CTRL_MEAS] &= 0xFC
+                regs[REG_STATUS] &= ~0x08
+        elif self._cycle_start is not None:
+            t_meas = self.measurement_time()
+            period = t_meas + STANDBY_TIMES[regs[REG_CONFIG] >> 5]
+            elapsed = now - self._cycle_start
+            done = int((elapsed - t_meas) // period) + 1 if elapsed >= t_meas \
+                else 0
+            first = max(self._cycles_done, done - MAX_CATCH_UP)
+            for k in range(first, done):
+                self._convert(self._cycle_start + k * period + t_meas)
+            self._cycles_done = done
+            if elapsed - (elapsed // period) * period < t_meas:
+                regs[REG_STATUS] |= 0x08
+            else:
+                regs[REG_STATUS] &= ~0x08
+
+    def _convert(self, t):
+        self.conversions += 1
+        regs = self.registers
+        osrs_t = (regs[REG_CTRL_MEAS] >> 2) & 0x07
+        osrs_p = regs[REG_CTRL_MEAS] >> 5
+        osrs_h = self._osrs_h
+        temperature, pressure, humidity = self.environment(t)
+        temperature = self._noisy(temperature, self.noise[0], osrs_t)
+        pressure = self._noisy(pressure, self.noise[1], osrs_p)
+        humidity = self._noisy(humidity, self.noise[2], osrs_h)
+        raw_t, raw_p, raw_h = self.raw_from_environment(
+            temperature, pressure, humidity)
+
+        coefficient = IIR_COEFFICIENTS[min((regs[REG_CONFIG] >> 2) & 0x07,
+                                           4)]
+        if osrs_t:
+            if self._filter_t is None or coefficient == 1:
+                self._filter_t = raw_t
+            else:
+                self._filter_t = (self._filter_t * (coefficient - 1) +
+                                  raw_t) // coefficient
+            raw_t = self._filter_t
+        else:
+            raw_t = 0x80000
+        if osrs_p:
+            if self._filter_p is None or coefficient == 1:
+                self._filter_p = raw_p
+            else:
+                self._filter_p = (self._filter_p * (coefficient - 1) +
+                                  raw_p) // coefficient
+            raw_p = self._filter_p
+        else:
+            raw_p = 0x80000
+        if not osrs_h:
+            raw_h = 0x8000
+        self._store_result(raw_t, raw_p, raw_h)
+
+    def _noisy(self, value, rms, osrs):
+        if not rms or not osrs:
+            return value
+        return value + self._random.gauss(0.0, rms / math.sqrt(
+            1 << (min(osrs, 5) - 1)))
+
+    def _store_result(self, raw_t, raw_p, raw_h):
+        regs = self.registers
+        regs[0xF7] = (raw_p >> 12) & 0xFF
+        regs[0xF8] = (raw_p >> 4) & 0xFF
+        regs[0xF9] = (raw_p << 4) & 0xF0
+        regs[0xFA] = (raw_t >> 12) & 0xFF
+        regs[0xFB] = (raw_t >> 4) & 0xFF
+        regs[0xFC] = (raw_t << 4) & 0xF0
+        regs[0xFD] = (raw_h >> 8) & 0xFF
+        regs[0xFE] = raw_h & 0xFF
+
+    def raw_from_environment(self, temperature, pressure, humidity):
+        """ Raw ADC words that compensate to the given degC, Pa, %RH """
+        cal = self._cal
+        result = [0, 0, 0]
+        target_t = int(round(temperature * 100))
+        target_p = int(round(pressure * 256))
+        target_h = int(round(humidity * 1024))
+
+        def search(bits, index, target, raw, increasing):
+            low = 0
+            high = (1 << bits) - 1
+            while low < high:
+                mid = (low + high) // 2
+                raw[index] = mid
+                bme280.compensate(cal, raw[0], raw[1], raw[2], result)
+                if (result[index] < target) == increasing:
+                    low = mid + 1
+                else:
+                    high = mid
+            raw[index] = low
+
+        raw = [0, 0x80000, 0x8000]
+        search(20, 0, target_t, raw, True)
+        search(20, 1, target_p, raw, False)
+        search(16, 2, target_h, raw, True)
+        return raw[0], raw[1], raw[2]
+
+
+class SimI2C(object):
+    """
+    I2C bus holding simulated sensors, with both the machine.I2C memory API
+    and the micro:bit write/read API. Counts transactions and bytes; with a
+    VirtualClock every transfer also advances time at the bus frequency.
+    """
+
+    def __init__(self, *devices, **kwargs):
+        self.devices = {}
+        for device in devices:
+            self.devices[device.address] = device
+        self.frequency = kwargs.get("frequency", 400000)
+        self.transactions = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self._pointer = {}
+
+    def reset_counters(self):
+        self.transactions = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+
+    def _device(self, addr):
+        device = self.devices.get(addr)
+        if device is None:
+            raise OSError(19)
+        return device
+
+    def _transfer(self, device, nread, nwritten):
+        self.transactions += 1
+        self.bytes_read += nread
+        self.bytes_written += nwritten
+        clock = device.clock
+        if isinstance(clock, VirtualClock):
+            # start/address/stop overhead plus 9 clocks per byte
+            clock.sleep((20 + 9 * (nread + nwritten)) / self.frequency)
+
+    # machine.I2C
+
+    def readfrom_mem(self, addr, memaddr, nbytes, addrsize=8):
+        buf = bytearray(nbytes)
+        self.readfrom_mem_into(addr, memaddr, buf)
+        return bytes(buf)
+
+    def readfrom_mem_into(self, addr, memaddr, buf, addrsize=8):
+        device = self._device(addr)
+        self._transfer(device, len(buf), 2)
+        device.read_into(memaddr, buf)
+
+    def writeto_mem(self, addr, memaddr, buf, addrsize=8):
+        device = self._device(addr)
+        self._transfer(device, 0, 1 + len(buf))
+        self._write_pairs(device, memaddr, buf)
+
+    def scan(self):
+        return sorted(self.devices)
+
+    # micro:bit
+
+    def write(self, addr, buf, repeat=False):
+        device = self._device(addr)
+        self._transfer(device, 0, len(buf))
+        if len(buf):
+            self._pointer[addr] = buf[0]
+            self._write_pairs(device, buf[0], buf[1:])
+
+    def read(self, addr, n, repeat=False):
+        device = self._device(addr)
+        self._transfer(device, n, 0)
+        buf = bytearray(n)
+        device.read_into(self._pointer.get(addr, 0), buf)
+        return bytes(buf)
+
+    def _write_pairs(self, device, register, data):
+        # I2C writes do not auto-increment: after the first data byte the
+        # stream continues as (register, value) pairs
+        if not len(data):
+            return
+        device.write_register(register, data[0])
+        for i in range(1, len(data) - 1, 2):
+            device.write_register(data[i], data[i + 1])
+
+
+class SimSPI(object):
+    """
+    SPI bus to one simulated sensor, for bme280_bus.SPIBus(spi, spi.cs).
+    While cs is low a control byte with bit 7 set starts an auto-increment
+    read; one with bit 7 clear is followed by a data byte and then the next
+    control byte. Only bits 6..0 of the register go on the wire, the chip
+    sets bit 7 again. frames keeps the bytes written in each cs low period.
+    """
+
+    def __init__(self, device, frequency=10000000):
+        self.device = device
+        self.frequency = frequency
+        self.frames = []
+        self.transactions = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self._selected = False
+        self._register = None
+        self._reading = False
+
+    def reset_counters(self):
+        self.frames = []
+        self.transactions = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+
+    def cs(self, value=None):
+        """ The chip select Pin: cs(0) selects the sensor """
+        if value is None:
+            return 0 if self._selected else 1
+        if not value and not self._selected:
+            self.transactions += 1
+            self.frames.append(bytearray())
+            self._register = None
+        self._selected = not value
+
+    def _clock(self, nbytes):
+        clock = self.device.clock
+        if isinstance(clock, VirtualClock):
+            clock.sleep(8 * nbytes / self.frequency)
+
+    def write(self, buf):
+        self._clock(len(buf))
+        if not self._selected:
+            return
+        self.bytes_written += len(buf)
+        self.frames[-1].extend(buf)
+        for byte in buf:
+            if self._register is None:
+                self._register = byte | 0x80
+                self._reading = bool(byte & 0x80)
+            elif not self._reading:
+                self.device.write_register(self._register, byte)
+                self._register = None
+
+    def readinto(self, buf, write=0):
+        self._clock(len(buf))
+        if not (self._selected and self._reading):
+            # nothing drives SDO
+            for i in range(len(buf)):
+                buf[i] = 0xFF
+            return
+        self.bytes_read += len(buf)
+        self.device.read_into(self._register, buf)
+        self._register += len(buf)
+
+
+_installed = {}
+
+
+def install(clock=None, i2c=None):
+    """
+    Make the MicroPython driver modules importable under CPython. Adds
+    ustruct, utime, micropython and microbit stand-ins to sys.modules and
+    sleep_us/sleep_ms/ticks_us/ticks_ms/ticks_diff/ticks_add to time.
+    With a VirtualClock, time.sleep and the added sleeps advance it instead
+    of blocking. i2c becomes microbit.i2c. uninstall() undoes it all.
+    """
+    clock = clock or RealClock()
+    mask = _TICKS_PERIOD - 1
+
+    def sleep(seconds):
+        clock.sleep(seconds)
+
+    def ticks_diff(end, start):
+        return ((end - start + (_TICKS_PERIOD >> 1)) & mask) - \
+            (_TICKS_PERIOD >> 1)
+
+    patches = {
+        "sleep": sleep,
+        "sleep_ms": lambda ms: clock.sleep(ms / 1000),
+        "sleep_us": lambda us: clock.sleep(us / 1000000),
+        "ticks_ms": lambda: int(clock() * 1000) & mask,
+        "ticks_us": lambda: int(clock() * 1000000) & mask,
+        "ticks_diff": ticks_diff,
+        "ticks_add": lambda ticks, delta: (ticks + delta) & mask,
+    }
+    if not isinstance(clock, VirtualClock):
+        del patches["sleep"]
+    uninstall()
+    for name, value in patches.items():
+        _installed[("time", name)] = getattr(time, name, None)
+        setattr(time, name, value)
+
+    ustruct = types.ModuleType("ustruct")
+    ustruct.pack = struct.pack
+    ustruct.pack_into = struct.pack_into
+    ustruct.calcsize = struct.calcsize
+    ustruct.unpack_from = struct.unpack_from
+    # MicroPython accepts buffers longer than the format
+    ustruct.unpack = lambda fmt, data: struct.unpack_from(fmt, data, 0)
+
+    micropython = types.ModuleType("micropython")
+    micropython.const = lambda value: value
+    micropython.native = lambda function: function
+    micropython.viper = lambda function: function
+    micropython.schedule = lambda function, arg: function(arg)
+
+    microbit = types.ModuleType("microbit")
+    microbit.sleep = lambda ms: clock.sleep(ms / 1000)
+    microbit.running_time = lambda: int(clock() * 1000)
+    microbit.i2c = i2c
+
+    for name, module in (("ustruct", ustruct), ("utime", time),
+                         ("micropython", micropython),
+                         ("microbit", microbit)):
+        _installed[("module", name)] = sys.modules.get(name)
+        sys.modules[name] = module
+
+
+def uninstall():
+    for (kind, name), previous in list(_installed.items()):
+        if kind == "time":
+            if previous is None:
+                delattr(time, name)
+            else:
+                setattr(time, name, previous)
+        elif previous is None:
+            sys.modules.pop(name, None)
+        else:
+            sys.modules[name] = previous
+    _installed.clear()
+
+
+@contextlib.contextmanager
+def installed(clock=None, i2c=None):
+    """
+    install() for the body of a with statement, on a new VirtualClock
+    unless clock is given; yields the clock:
+
+        with bme280_sim.installed() as clock:
+            import bme280
+            ...
+    """
+    clock = clock or VirtualClock()
+    install(clock, i2c)
+    try:
+        yield clock
+    finally:
+        uninstall()
+
+
+def driver(name, i2c, **kwargs):
+    """
+    BME280 of the driver module name (bme280, bme280_lowmem, ...) on i2c,
+    at the 0x76 address of a default SimulatedBME280; the micro:bit builds
+    default to 0x77. Call with install() in effect.
+    """
+    __import__(name)
+    kwargs.setdefault("address", 0x76)
+    return sys.modules[name].BME280(i2c=i2c, **kwargs)
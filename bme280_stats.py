@@ -0,0 +1,191 @@
+"""
+Optional instrumentation for bme280.BME280: counters and cumulative ticks_us
+timers for each phase of a read.
+
+attach() shadows the driver's phase methods with timed wrappers on that one
+instance and detach() removes them again, so a sensor without stats runs
+the plain methods and pays nothing.
+
+    stats = sensor.enable_stats()
+    sensor.read_compensated_data()
+    print(stats.snapshot())
+    stats.reset()
+
+Phases of a forced read: trigger (ctrl_meas write), sleep (the learned
+conversion wait), poll (status reads until the measuring bit clears), burst
+(the 8-byte readout) and compensate. Normal mode reads are only burst and
+compensate. read_raw_async of bme280_async counts as a read too.
+"""
+
+import time
+
+FIELDS = ("reads", "read_us",
+          "triggers", "trigger_us",
+          "sleep_us",
+          "waits", "polls", "poll_us",
+          "bursts", "burst_us",
+          "compensations", "compensate_us",
+          "bus_reads", "bus_writes", "bus_errors")
+
+READS = 0
+READ_US = 1
+TRIGGERS = 2
+TRIGGER_US = 3
+SLEEP_US = 4
+WAITS = 5
+POLLS = 6
+POLL_US = 7
+BURSTS = 8
+BURST_US = 9
+COMPENSATIONS = 10
+COMPENSATE_US = 11
+BUS_READS = 12
+BUS_WRITES = 13
+BUS_ERRORS = 14
+
+# Methods shadowed on the instance while attached
+_WRAPPED = ("read_raw_data", "_start_forced", "_measure_forced",
+            "_wait_ready", "_learn_timing", "_read_result", "_compensate_raw",
+            "_bus_read_into", "_bus_write")
+
+
+class Stats(object):
+    """
+    Counters of one sensor, indexed by the constants above. Timers are
+    cumulative microseconds; divide by the matching count for a mean.
+    """
+
+    def __init__(self):
+        self.counters = [0] * len(FIELDS)
+
+    def reset(self):
+        counters = self.counters
+        for i in range(len(counters)):
+            counters[i] = 0
+
+    def snapshot(self, reset=False):
+        """ Counters as a dict, optionally resetting them """
+        result = dict(zip(FIELDS, self.counters))
+        if reset:
+            self.reset()
+        return result
+
+    def __repr__(self):
+        return "Stats({})".format(self.snapshot())
+
+
+def attach(sensor):
+    """ Instrument sensor and return its Stats (reused when attached) """
+    if sensor.stats is not None:
+        return sensor.stats
+    stats = Stats()
+    c = stats.counters
+    ticks_us = time.ticks_us
+    ticks_diff = time.ticks_diff
+
+    read_raw_data = sensor.read_raw_data
+    start_forced = sensor._start_forced
+    measure_forced = sensor._measure_forced
+    wait_ready = sensor._wait_ready
+    learn_timing = sensor._learn_timing
+    read_result = sensor._read_result
+    compensate_raw = sensor._compensate_raw
+    bus_read_into = sensor._bus_read_into
+    bus_write = sensor._bus_write
+
+    def timed_read_raw_data(result):
+        start = ticks_us()
+        read_raw_data(result)
+        c[READS] += 1
+        c[READ_US] += ticks_diff(ticks_us(), start)
+
+    def timed_start_forced():
+        start = ticks_us()
+        ticks = start_forced()
+        c[TRIGGERS] += 1
+        c[TRIGGER_US] += ticks_diff(ticks_us(), start)
+        return ticks
+
+    def timed_measure_forced():
+        # Whatever trigger and poll did not take was spent sleeping
+        start = ticks_us()
+        busy = c[TRIGGER_US] + c[POLL_US]
+        measure_forced()
+        c[SLEEP_US] += (ticks_diff(ticks_us(), start) -
+                        (c[TRIGGER_US] + c[POLL_US] - busy))
+
+    def timed_wait_ready(start_ticks):
+        start = ticks_us()
+        wait_ready(start_ticks)
+        c[WAITS] += 1
+        c[POLL_US] += ticks_diff(ticks_us(), start)
+
+    def counted_learn_timing(elapsed, polls):
+        c[POLLS] += polls
+        learn_timing(elapsed, polls)
+
+    def timed_read_result(result):
+        start = ticks_us()
+        read_result(result)
+        c[BURSTS] += 1
+        c[BURST_US] += ticks_diff(ticks_us(), start)
+
+    def timed_compensate_raw(result):
+        start = ticks_us()
+        result = compensate_raw(result)
+        c[COMPENSATIONS] += 1
+        c[COMPENSATE_US] += ticks_diff(ticks_us(), start)
+        return result
+
+    def counted_bus_read_into(register, buf):
+        c[BUS_READS] += 1
+        try:
+            bus_read_into(register, buf)
+        except OSError:
+            c[BUS_ERRORS] += 1
+            raise
+
+    def counted_bus_write(register, buf):
+        c[BUS_WRITES] += 1
+        try:
+            bus_write(register, buf)
+        except OSError:
+            c[BUS_ERRORS] += 1
+            raise
+
+    read_raw_async = getattr(sensor, "read_raw_async", None)
+    if read_raw_async is not None:
+        # bme280_async reads do not go through read_raw_data
+        async def timed_read_raw_async(result):
+            start = ticks_us()
+            await read_raw_async(result)
+            c[READS] += 1
+            c[READ_US] += ticks_diff(ticks_us(), start)
+            return result
+        sensor.read_raw_async = timed_read_raw_async
+
+    sensor.read_raw_data = timed_read_raw_data
+    sensor._start_forced = timed_start_forced
+    sensor._measure_forced = timed_measure_forced
+    sensor._wait_ready = timed_wait_ready
+    sensor._learn_timing = counted_learn_timing
+    sensor._read_result = timed_read_result
+    sensor._compensate_raw = timed_compensate_raw
+    sensor._bus_read_into = counted_bus_read_into
+    sensor._bus_write = counted_bus_write
+    sensor.stats = stats
+    return stats
+
+
+def detach(sensor):
+    """ Restore the plain methods; the Stats object keeps its counts """
+    if sensor.stats is None:
+        return
+    for name in _WRAPPED:
+        delattr(sensor, name)
+    if hasattr(sensor, "read_raw_async"):
+        # attach() wrapped it on the instance
+        del sensor.read_raw_async
+    sensor._bus_read_into = sensor.bus.read_into
+    sensor._bus_write = sensor.bus.write
+    sensor.stats = None
@@ -0,0 +1,44 @@
+"""
+Unit conversion and formatting for bme280.BME280, imported on
+first use so the core driver stays small.
+
+Compensated samples are (temperature, pressure, humidity) in the units of
+BME280.read_compensated_data: 0.01 degC, Pa as Q24.8 and %RH as Q22.10.
+"""
+
+
+def to_float(sample, scale='C'):
+    """ Temperature in degrees of scale, pressure in Pa, humidity in %RH """
+    temp = sample[0] / 100
+    if scale == 'F':
+        temp = 32 + (temp * 1.8)
+    elif scale == 'K':
+        temp = temp + 273.15
+    return (temp, sample[1] / 256, sample[2] / 1024)
+
+
+def formatted(values, scale='C'):
+    """ to_float() values as strings with their units """
+    t, p, h = values
+    return ("{} ".format(t) + scale, "{} Pa".format(p), "{} %".format(h))
+
+
+def centi_degrees(temperature, scale='C'):
+    """ 0.01 degC to hundredths of a degree of scale, in integers """
+    if scale == 'F':
+        return (temperature * 18 + 5) // 10 + 3200
+    if scale == 'K':
+        return temperature + 27315
+    return temperature
+
+
+def scale_into(buf, scale='C'):
+    """
+    Convert a compensated sample in place to temperature in hundredths of a
+    degree of scale, pressure in Pa x 100 and humidity in %RH x 100
+    """
+    buf[0] = centi_degrees(buf[0], scale)
+    # x 100 / 256 and x 100 / 1024 kept below 2**30
+    buf[1] = (buf[1] * 25 + 32) >> 6
+    buf[2] = (buf[2] * 25 + 128) >> 8
+    return buf
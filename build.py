@@ -0,0 +1,168 @@
+"""
+Precompile the drivers to .mpy bytecode with mpy-cross (pip install
+mpy-cross) for copying to a board or freezing into firmware:
+
+    python build.py                    # every driver module into build/
+    python build.py --march armv7m     # allow @micropython.native code
+    python build.py bme280 bme280_units
+    python build.py --variants         # regenerate the generated modules
+
+The .mpy files load without running the compiler on the device, which is
+what runs out of heap on small boards, and a source comparison of sizes is
+printed for each module.
+
+bme280_lowmem, bme280_microbit and bme280_microbit_lowmem are generated
+from bme280_small.py.in: `#if FLAG` / `#else` / `#endif` lines select the
+platform adapter and `#include name` pastes function name from bme280.py,
+so the compensation kernel, timing and readout parsing are shared with
+the full driver. bme280_native is generated the same way from
+bme280_native.py.in. The *_lowmem variants are stripped of docstrings,
+comments and blank lines, which is what the on-device compiler of a
+micro:bit runs out of RAM on.
+"""
+
+import argparse
+import ast
+import os
+import subprocess
+import sys
+
+# Modules that make sense on a board; the simulator, benchmarks and tests
+# are host-only.
+MODULES = ("bme280", "bme280_units", "bme280_altitude",
+           "bme280_derived", "bme280_cache",
+           "bme280_profiles",
+           "bme280_stats", "bme280_native", "bme280_bus", "bme280_group",
+           "bme280_sampler", "bme280_async", "bme280_record",
+           "bme280_filter", "bme280_change",
+           "bme280_lowmem",
+           "bme280_microbit", "bme280_microbit_lowmem")
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+TEMPLATE = "bme280_small.py.in"
+# Generated module: (template, flags, minify). SHORT_NAMES keeps the
+# t_mode/p_mode/h_mode arguments and addr attribute of the original
+# micro:bit lowmem driver. DIG keeps the public dig_* attributes, PARTIAL
+# skips channels with oversampling 0 and LEARN learns the conversion
+# wait; the *_lowmem variants leave out what their originals did not have.
+GENERATED = {
+    "bme280_lowmem": (TEMPLATE, ("MACHINE", "DIG"), True),
+    "bme280_microbit": (TEMPLATE, ("MICROBIT", "DIG", "PARTIAL", "LEARN"),
+                        False),
+    "bme280_microbit_lowmem": (TEMPLATE, ("MICROBIT", "SHORT_NAMES"), True),
+    "bme280_native": ("bme280_native.py.in", (), False),
+}
+# The small drivers among them
+VARIANTS = ("bme280_lowmem", "bme280_microbit", "bme280_microbit_lowmem")
+HEADER = "# Generated from {0} by build.py --variants, do not edit.\n"
+
+
+def _functions(path):
+    """ Source of each top-level function of the module at path by name """
+    with open(path) as f:
+        source = f.read()
+    lines = source.splitlines(True)
+    return dict((node.name, "".join(lines[node.lineno - 1:node.end_lineno]))
+                for node in ast.parse(source).body
+                if isinstance(node, ast.FunctionDef))
+
+
+def _minify(source):
+    # Drop docstrings, then comment-only and blank lines, and indent by
+    # one space per level
+    drop = set()
+    for node in ast.walk(ast.parse(source)):
+        if isinstance(node, (ast.Module, ast.ClassDef, ast.FunctionDef)):
+            first = node.body[0]
+            if (isinstance(first, ast.Expr) and
+                    isinstance(first.value, ast.Constant) and
+                    isinstance(first.value.value, str)):
+                drop.update(range(first.lineno, first.end_lineno + 1))
+    out = []
+    for number, line in enumerate(source.splitlines(True), 1):
+        code = line.lstrip(" ")
+        if number in drop or not code.strip() or code.startswith("#"):
+            continue
+        out.append(" " * ((len(line) - len(code)) // 4) + code)
+    return "".join(out)
+
+
+def render_variant(name):
+    """ Source of the generated module name """
+    template, flags, minify = GENERATED[name]
+    functions = _functions(os.path.join(HERE, "bme280.py"))
+    out = []
+    active = [True]
+    with open(os.path.join(HERE, template)) as f:
+        lines = f.readlines()
+    for line in lines:
+        words = line.split()
+        directive = words[0] if words and line.startswith("#") else None
+        if directive == "#if":
+            active.append(active[-1] and words[1] in flags)
+        elif directive == "#else":
+            active[-1] = not active[-1] and active[-2]
+        elif directive == "#endif":
+            active.pop()
+        elif not active[-1]:
+            continue
+        elif directive == "#include":
+            out.append(functions[words[1]])
+        else:
+            out.append(line)
+    source = "".join(out)
+    if minify:
+        source = _minify(source)
+    return HEADER.format(template) + source
+
+
+def write_variants(names=GENERATED):
+    for name in names:
+        with open(os.path.join(HERE, name + ".py"), "w") as f:
+            f.write(render_variant(name))
+        print("generated " + name + ".py")
+
+
+def compile_module(name, out_dir, mpy_cross="mpy-cross", march=None):
+    """ Compile name.py into out_dir/name.mpy and return its path """
+    source = os.path.join(HERE, name + ".py")
+    target = os.path.join(out_dir, name + ".mpy")
+    command = [mpy_cross, "-o", target, "-s", name + ".py"]
+    if march:
+        command.append("-march=" + march)
+    subprocess.check_call(command + [source])
+    return target
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("modules", nargs="*", default=MODULES)
+    parser.add_argument("--out", default=os.path.join(HERE, "build"))
+    parser.add_argument("--mpy-cross", default="mpy-cross")
+    parser.add_argument("--march", help="target architecture for native code")
+    parser.add_argument("--variants", action="store_true",
+                        help="regenerate the small drivers and "
+                             "bme280_native from their templates")
+    args = parser.parse_args(argv)
+
+    if args.variants:
+        write_variants()
+        return 0
+
+    if not os.path.isdir(args.out):
+        os.makedirs(args.out)
+    for name in args.modules:
+        if name == "bme280_native" and not args.march:
+            # The native emitter needs a target; without one the driver
+            # falls back to the bytecode kernel anyway
+            continue
+        target = compile_module(name, args.out, args.mpy_cross, args.march)
+        print("{:<26}{:>7} B .py {:>7} B .mpy".format(
+            name, os.path.getsize(os.path.join(HERE, name + ".py")),
+            os.path.getsize(target)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
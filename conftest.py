@@ -0,0 +1,2 @@
+# test_microbit.py and test_alloc.py are board scripts: run them on the device
+collect_ignore = ["test_microbit.py", "test_alloc.py"]
@@ -0,0 +1,57 @@
+"""
+Asserts that the buffer based read path of bme280.BME280 does not grow
+the heap, in normal and forced mode. Run on a MicroPython board or the
+unix port:
+    micropython test_alloc.py
+
+Small ints are 31 bits on 32-bit ports (ESP8266, ESP32, micro:bit),
+where compensation needs big int intermediates (dig_P4 << 35, the
+pressure and humidity products): there only the raw read is checked,
+the compensated and scaled reads are reported. The host test suite
+does not run this file: run it after changing the read path.
+"""
+import gc
+import sys
+from array import array
+import bme280
+import bme280_bus
+
+N = 100
+# Compensation stays in small ints only with 63-bit small ints
+WIDE = sys.maxsize > 1 << 32
+
+# Calibration NVM (0x88..0xA1, 0xE1..0xE7) and one result (0xF7..0xFE)
+CALIB_88 = bytes([
+    0x70, 0x6B, 0x43, 0x67, 0x18, 0xFC, 0x7D, 0x8E, 0x43, 0xD6, 0xD0, 0x0B,
+    0x27, 0x0B, 0x8C, 0x00, 0xF9, 0xFF, 0x8C, 0x3C, 0xF8, 0xC6, 0x70, 0x17,
+    0x00, 0x4B])
+CALIB_E1 = bytes([0x6A, 0x01, 0x00, 0x13, 0x29, 0x03, 0x1E])
+READOUT = bytes([0x65, 0x5A, 0xC0, 0x7E, 0xED, 0x00, 0x75, 0x30])
+
+
+def heap_growth(read, buf):
+    read(buf)
+    gc.collect()
+    gc.disable()
+    before = gc.mem_alloc()
+    for _ in range(N):
+        read(buf)
+    grown = gc.mem_alloc() - before
+    gc.enable()
+    return grown
+
+
+if __name__ == "__main__":
+    buf = array("i", [0, 0, 0])
+    for mode in (bme280.MODE_NORMAL, bme280.MODE_FORCED):
+        bus = bme280_bus.FakeBus(
+            {0x88: CALIB_88, 0xE1: CALIB_E1, 0xF7: READOUT})
+        sensor = bme280.BME280(bus=bus, mode=mode)
+        for name, read in (("raw", sensor.read_raw_into),
+                           ("compensated", sensor.read_compensated_into),
+                           ("scaled", sensor.read_scaled_into)):
+            grown = heap_growth(read, buf)
+            print("mode {} {}: {} bytes over {} reads".format(
+                mode, name, grown, N))
+            if WIDE or name == "raw":
+                assert grown == 0, name
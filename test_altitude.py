@@ -0,0 +1,42 @@
+"""
+bme280_altitude against the barometric formula in floating point.
+Run with pytest or `python test_altitude.py`.
+"""
+import bme280_sim
+
+
+def reference_altitude(pressure, pressure_sea_level=1013.25):
+    """
+    Altitude in metres from a Q24.8 pressure and the sea level pressure in
+    hPa, by the International Barometric Formula in floating point
+    """
+    return 44330 * (1 - (pressure / 25600 / pressure_sea_level) **
+                    (1 / 5.255))
+
+
+def test_altitude_table():
+    import bme280_altitude
+    for sea_level in (88000, 101325, 120000):
+        for hpa in range(300, 1101, 25):
+            ratio = hpa * 100 / sea_level
+            if not 0.25 <= ratio < 1.25:
+                continue
+            pressure = hpa * 25600 + 77
+            exact = reference_altitude(pressure, sea_level / 100) * 100
+            table = bme280_altitude.altitude_cm(pressure, sea_level)
+            assert abs(table - exact) < 20
+            assert abs(bme280_altitude.sea_level_pressure(
+                pressure, table) - sea_level) <= 1
+
+    with bme280_sim.installed() as clock:
+        import bme280
+        driver = bme280.BME280(i2c=bme280_sim.SimI2C(
+            bme280_sim.SimulatedBME280(clock=clock)))
+        sample = driver.read_compensated_data()
+        driver.calibrate_altitude(523.4, sample)
+        assert abs(driver.altitude(sample=sample) - 523.4) < 0.05
+
+
+if __name__ == "__main__":
+    test_altitude_table()
+    print("altitude ok")
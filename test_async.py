@@ -0,0 +1,100 @@
+"""
+bme280_async on bme280_sim, with asyncio sleeps on the virtual clock.
+Run with pytest or `python test_async.py`.
+"""
+import asyncio
+import types
+import bme280_sim
+
+
+def _run(clock, coroutine):
+    # asyncio.sleep advances the virtual clock, then yields to the loop
+    import bme280_async
+
+    async def sleep(seconds):
+        clock.sleep(seconds)
+        await asyncio.sleep(0)
+    real = bme280_async.asyncio
+    bme280_async.asyncio = types.SimpleNamespace(Lock=asyncio.Lock,
+                                                 sleep=sleep)
+    try:
+        return asyncio.run(coroutine)
+    finally:
+        bme280_async.asyncio = real
+
+
+def test_read_async():
+    with bme280_sim.installed() as clock:
+        import bme280_async
+        sim = bme280_sim.SimulatedBME280(
+            clock=clock, environment=bme280_sim.constant(23.5, 98000.0, 55.0))
+        sensor = bme280_async.BME280(i2c=bme280_sim.SimI2C(sim))
+
+        async def main():
+            start = clock.now
+            temp, pres, humi = await sensor.read_async()
+            elapsed = clock.now - start
+            # two concurrent reads take the lock in turn
+            both = await asyncio.gather(sensor.read_async(),
+                                        sensor.read_async())
+            return (temp, pres, humi), elapsed, both
+        (temp, pres, humi), elapsed, both = _run(clock, main())
+        assert abs(temp - 2350) <= 1
+        assert abs(pres - 98000 * 256) <= 256
+        assert abs(humi - 55 * 1024) <= 16
+        # one conversion: about 40 ms, not the 46.1 ms maximum plus polls
+        assert 0.038 < elapsed < 0.045
+        assert sim.conversions == 3
+        assert [s[0] for s in both] == [temp, temp]
+
+
+def test_samples_iterator():
+    with bme280_sim.installed() as clock:
+        import bme280
+        import bme280_async
+        sim = bme280_sim.SimulatedBME280(
+            clock=clock, environment=bme280_sim.step(
+                (21.0, 101325.0, 45.0), (25.0, 101325.0, 45.0), 2.5))
+        sensor = bme280_async.BME280(i2c=bme280_sim.SimI2C(sim),
+                                     iir=bme280.FILTER_OFF)
+
+        async def main():
+            samples = []
+            times = []
+            async for sample in sensor.samples(1000):
+                samples.append(sample[0])
+                times.append(clock.now)
+                if len(samples) == 4:
+                    break
+            return samples, times
+        samples, times = _run(clock, main())
+        assert [round(t / 100) for t in samples] == [21, 21, 21, 25]
+        steps = [b - a for a, b in zip(times, times[1:])]
+        assert all(abs(step - 1.0) < 0.002 for step in steps), steps
+
+
+def test_async_stats():
+    with bme280_sim.installed() as clock:
+        import bme280_async
+        sim = bme280_sim.SimulatedBME280(clock=clock)
+        sensor = bme280_async.BME280(i2c=bme280_sim.SimI2C(sim))
+        stats = sensor.enable_stats()
+
+        async def main():
+            await sensor.read_async()
+            await sensor.read_async()
+        _run(clock, main())
+        counters = stats.snapshot()
+        assert counters["reads"] == 2 and counters["read_us"] > 0
+        assert counters["triggers"] == 2 and counters["bursts"] == 2
+        sensor.enable_stats(False)
+        assert "read_raw_async" not in sensor.__dict__
+        _run(clock, main())
+        assert stats.snapshot()["reads"] == 2
+
+
+if __name__ == "__main__":
+    test_read_async()
+    test_samples_iterator()
+    test_async_stats()
+    print("async ok")
@@ -0,0 +1,177 @@
+"""
+bme280.BME280 against bme280_sim.
+Run with pytest or `python test_bme280.py`.
+"""
+import bme280_sim
+
+
+def test_partial_channels():
+    with bme280_sim.installed() as clock:
+        import bme280
+        i2c = bme280_sim.SimI2C(bme280_sim.SimulatedBME280(clock=clock))
+        driver = bme280.BME280(i2c=i2c, iir=bme280.FILTER_OFF)
+        full = list(driver.read_compensated_data())
+
+        def timed_read():
+            i2c.reset_counters()
+            start = clock.now
+            sample = list(driver.read_compensated_data())
+            return sample, clock.now - start, i2c.bytes_read
+
+        driver.set_channels(pressure=False, humidity=False)
+        sample, elapsed, nread = timed_read()
+        assert sample == [full[0], 0, 0]
+        assert elapsed < 0.008
+        # trigger, 1 byte status polls, then a 3 byte burst
+        assert nread - (i2c.transactions - 2) == 3
+        driver.set_channels(pressure=False)
+        assert driver.humidity_mode == bme280.OSAMPLE_1
+        sample, elapsed, nread = timed_read()
+        assert sample[0] == full[0] and sample[1] == 0
+        assert abs(sample[2] - full[2]) < 8
+        driver.set_channels()
+        assert driver.pressure_mode == bme280.OSAMPLE_16
+        sample, elapsed, nread = timed_read()
+        assert abs(sample[1] - full[1]) < 256
+
+
+def test_learned_wait():
+    with bme280_sim.installed() as clock:
+        from array import array
+        import bme280
+        sleeps = []
+        sleep = clock.sleep
+
+        def recording_sleep(seconds):
+            sleeps.append(seconds)
+            sleep(seconds)
+        clock.sleep = recording_sleep
+        raw = array("i", [0, 0, 0])
+        # part-to-part spread: fast, typical, slow, and slower than max
+        for scale in (0.8, 1.0, 1.1, 2.0):
+            sensor = bme280_sim.SimulatedBME280(
+                clock=clock, conversion_scale=scale)
+            driver = bme280.BME280(i2c=bme280_sim.SimI2C(sensor))
+            for _ in range(60):
+                driver.read_raw_data(raw)
+            t_typ = driver._t_typ
+            t_max = driver._t_max
+            t_wait = driver._t_wait
+            assert (t_typ * 3) >> 2 <= t_wait <= t_max, scale
+            observed = sensor.measurement_time() * 1000000
+            expected = min(max(observed, (t_typ * 3) >> 2), t_max)
+            assert abs(t_wait - expected) < expected / 20, scale
+        # status polls back off to 1 ms and no further
+        assert max(s for s in sleeps if s < 0.01) == 0.001
+
+
+def test_normal_mode():
+    with bme280_sim.installed() as clock:
+        import bme280
+        sim = bme280_sim.SimulatedBME280(
+            clock=clock, environment=bme280_sim.constant(23.5, 98000.0, 55.0))
+        i2c = bme280_sim.SimI2C(sim)
+        driver = bme280.BME280(i2c=i2c)
+        driver.set_mode(bme280.MODE_NORMAL, bme280.STANDBY_62_5)
+        assert sim.registers[0xF4] & 0x03 == bme280.MODE_NORMAL
+        assert sim.registers[0xF5] >> 5 == bme280.STANDBY_62_5
+        clock.sleep(1.0)
+        for _ in range(5):
+            i2c.reset_counters()
+            sim.read(0xF3, 1)  # bring the model up to the clock
+            conversions = sim.conversions
+            start = clock.now
+            temp, pres, humi = driver.read_compensated_data()
+            # one burst read of the latest result: no trigger, no polling
+            # and no conversion wait
+            assert i2c.transactions == 1 and i2c.bytes_written == 2
+            assert i2c.bytes_read == 8
+            assert sim.conversions == conversions
+            assert clock.now - start < 0.001
+            assert abs(temp - 2350) <= 1
+            clock.sleep(0.1)
+        driver.set_mode(bme280.MODE_FORCED)
+        assert sim.registers[0xF4] & 0x03 == 0
+        sim.read(0xF3, 1)
+        conversions = sim.conversions
+        clock.sleep(1.0)
+        sim.read(0xF3, 1)
+        assert sim.conversions == conversions
+
+
+def test_first_read():
+    with bme280_sim.installed() as clock:
+        import bme280
+        for mode in (bme280.MODE_NORMAL, bme280.MODE_SLEEP):
+            sim = bme280_sim.SimulatedBME280(
+                clock=clock,
+                environment=bme280_sim.constant(10.0, 90000.0, 30.0))
+            driver = bme280.BME280(i2c=bme280_sim.SimI2C(sim), mode=mode)
+            # no reset words before the first conversion
+            temp, pres, humi = driver.values
+            assert abs(temp - 10.0) < 0.02
+            assert abs(pres - 90000.0) < 2
+            assert abs(humi - 30.0) < 0.1
+
+
+def test_snapshot_max_age():
+    with bme280_sim.installed() as clock:
+        import bme280
+        sim = bme280_sim.SimulatedBME280(clock=clock)
+        i2c = bme280_sim.SimI2C(sim)
+        driver = bme280.BME280(i2c=i2c, max_age=500)
+        stats = driver.enable_stats()
+        # one conversion serves the three properties
+        values = (driver.temperature, driver.pressure, driver.humidity)
+        assert sim.conversions == 1
+        assert stats.snapshot()["reads"] == 1
+        assert abs(values[0] - 21.0) < 0.02
+        assert driver.values == values and sim.conversions == 1
+        clock.sleep(0.5)
+        driver.temperature
+        assert sim.conversions == 2
+        # max_age=0 measures on every access
+        assert driver.snapshot(max_age=0) is driver.snapshot(max_age=0)
+        assert sim.conversions == 4
+        driver.max_age = 0
+        driver.temperature
+        driver.humidity
+        assert sim.conversions == 6
+
+
+def test_configure():
+    with bme280_sim.installed() as clock:
+        import bme280
+        sim = bme280_sim.SimulatedBME280(clock=clock)
+        i2c = bme280_sim.SimI2C(sim)
+        driver = bme280.BME280(i2c=i2c)
+        driver.configure(bme280.MODE_NORMAL, bme280.OSAMPLE_1,
+                         bme280.OSAMPLE_4, bme280.OSAMPLE_0,
+                         bme280.FILTER_2, bme280.STANDBY_10)
+        assert sim.registers[0xF2] == 0
+        assert sim.registers[0xF4] == 3 << 5 | 1 << 2 | 3
+        assert sim.registers[0xF5] == 6 << 5 | 1 << 2
+        # one bad setting rejects the whole update
+        i2c.reset_counters()
+        for settings in ({"iir": 5}, {"standby": 8}, {"mode": 2},
+                         {"humidity": 6}):
+            try:
+                driver.configure(temperature=bme280.OSAMPLE_16, **settings)
+            except ValueError:
+                pass
+            else:
+                assert False, settings
+        assert i2c.transactions == 0
+        assert driver.temperature_mode == bme280.OSAMPLE_1
+        driver.set_iir(bme280.FILTER_2)
+        assert i2c.transactions == 0
+
+
+if __name__ == "__main__":
+    test_partial_channels()
+    test_learned_wait()
+    test_normal_mode()
+    test_first_read()
+    test_snapshot_max_age()
+    test_configure()
+    print("bme280 ok")
@@ -0,0 +1,54 @@
+"""
+bme280_bus: SPIBus against the bme280_sim SPI protocol model.
+Run with pytest or `python test_bus.py`.
+"""
+import bme280_sim
+
+
+def test_spi_bus():
+    with bme280_sim.installed() as clock:
+        import bme280
+        import bme280_bus
+        sensor = bme280_sim.SimulatedBME280(
+            clock=clock, environment=bme280_sim.constant(23.5, 98000.0, 55.0))
+        spi = bme280_sim.SimSPI(sensor)
+        driver = bme280.BME280(bus=bme280_bus.SPIBus(spi, spi.cs))
+        temp, pres, humi = driver.read_compensated_data()
+        assert abs(temp - 2350) <= 1
+        assert abs(pres - 98000 * 256) <= 256
+        assert abs(humi - 55 * 1024) <= 16
+        # reads send one address byte with the read bit, writes a
+        # (register & 0x7F, value) pair per byte
+        for frame in spi.frames:
+            if frame[0] & 0x80:
+                assert len(frame) == 1
+            else:
+                assert len(frame) % 2 == 0
+                assert all(a < 0x80 for a in frame[::2])
+        spi.reset_counters()
+        driver.bus.write(bme280.BME280_REGISTER_CONTROL_HUM, b'\x03\x00\x24')
+        assert spi.frames == [bytearray(b'\x72\x03\x73\x00\x74\x24')]
+        assert sensor.registers[0xF2] == 0x03
+        assert sensor.registers[0xF4] == 0x24
+
+
+def test_spi_three_wire():
+    with bme280_sim.installed() as clock:
+        import bme280
+        import bme280_bus
+        sensor = bme280_sim.SimulatedBME280(clock=clock)
+        spi = bme280_sim.SimSPI(sensor)
+        bus = bme280_bus.SPIBus(spi, spi.cs, three_wire=True)
+        assert sensor.registers[0xF5] == 0x01
+        driver = bme280.BME280(bus=bus, iir=bme280.FILTER_2,
+                               standby=bme280.STANDBY_10)
+        assert sensor.registers[0xF5] == 6 << 5 | 1 << 2 | 1
+        driver.set_iir(bme280.FILTER_OFF)
+        assert sensor.registers[0xF5] == 6 << 5 | 1
+        assert driver.read_compensated_data()[0] != 0
+
+
+if __name__ == "__main__":
+    test_spi_bus()
+    test_spi_three_wire()
+    print("bus ok")
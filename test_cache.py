@@ -0,0 +1,38 @@
+"""
+bme280_cache: constructing from a calibration blob.
+Run with pytest or `python test_cache.py`.
+"""
+import bme280_sim
+
+
+def test_calibration_cache_restore():
+    with bme280_sim.installed() as clock:
+        import bme280
+        sensor = bme280_sim.SimulatedBME280(clock=clock)
+        i2c = bme280_sim.SimI2C(sensor)
+        cold = bme280.BME280(i2c=i2c)
+        expected = cold.read_compensated_data()
+        blob = cold.calibration_blob()
+        i2c.reset_counters()
+        warm = bme280.BME280(i2c=i2c, cache=blob)
+        # calibration fingerprint and config registers only, no writes
+        assert i2c.transactions == 2 and i2c.bytes_read == 8
+        assert warm.read_compensated_data() == expected
+        # a power cycled chip is configured again, without the NVM read
+        sensor.reset()
+        i2c.reset_counters()
+        bme280.BME280(i2c=i2c, cache=blob)
+        assert i2c.transactions == 5 and i2c.bytes_read == 8
+        # another chip has the same id but not the same trimming
+        calibration = list(bme280_sim.DEFAULT_CALIBRATION)
+        calibration[1] += 40
+        other = bme280_sim.SimI2C(bme280_sim.SimulatedBME280(
+            clock=clock, calibration=tuple(calibration)))
+        swapped = bme280.BME280(i2c=other, cache=blob)
+        assert swapped.dig_T2 == calibration[1]
+        assert abs(swapped.read_compensated_data()[0] - 2100) <= 1
+
+
+if __name__ == "__main__":
+    test_calibration_cache_restore()
+    print("cache ok")
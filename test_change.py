@@ -0,0 +1,39 @@
+"""
+bme280_change on a simulated temperature step.
+Run with pytest or `python test_change.py`.
+"""
+import bme280_sim
+
+
+def test_change_detection():
+    with bme280_sim.installed() as clock:
+        import bme280
+        import bme280_change
+        sim = bme280_sim.SimulatedBME280(
+            clock=clock, environment=bme280_sim.step(
+                (21.0, 101325.0, 45.0), (31.0, 101325.0, 45.0), 5.0))
+        driver = bme280.BME280(i2c=bme280_sim.SimI2C(sim),
+                               iir=bme280.FILTER_OFF)
+        reported = []
+        crossings = []
+        detector = bme280_change.ChangeDetector(
+            driver, on_change=lambda s: reported.append(s[0]), heartbeat=20)
+        detector.add_threshold(
+            bme280_change.TEMPERATURE, 3000,
+            lambda channel, rising, s: crossings.append((channel, rising)))
+        stats = driver.enable_stats()
+        for _ in range(10):
+            detector.poll()
+            clock.sleep(1.0)
+        assert reported == [2100, 3100]
+        assert crossings == [(bme280_change.TEMPERATURE, True)]
+        assert detector.skipped == 8
+        assert stats.snapshot()["compensations"] == 2
+        for _ in range(20):
+            detector.poll()
+        assert len(reported) == 3
+
+
+if __name__ == "__main__":
+    test_change_detection()
+    print("change ok")
@@ -0,0 +1,41 @@
+"""
+bme280_derived against the Magnus formula and NWS heat index table.
+Run with pytest or `python test_derived.py`.
+"""
+
+
+def test_derived_quantities():
+    import math
+    import bme280_derived
+    import bme280_units
+    for t in range(-4000, 8501, 250):
+        for rh in (10, 40, 75, 100):
+            celsius = t / 100
+            e = 6.112 * rh * math.exp(17.62 * celsius / (243.12 + celsius))
+            gamma = math.log(e / 611.2)
+            dew = 243.12 * gamma / (17.62 - gamma)
+            assert abs(bme280_derived.dew_point(t, rh << 10) - dew * 100) < 5
+            density = 2166.79 * e / (celsius + 273.15)
+            assert abs(bme280_derived.absolute_humidity(t, rh << 10) -
+                       density) <= 1 + density / 500
+    # compensate() clamps humidity to 0, and dry cold air has its dew point
+    # below the table: both read as the floor instead of raising
+    assert bme280_derived.dew_point(2000, 0) == bme280_derived.DEW_POINT_MIN
+    assert bme280_derived.dew_point(-4000, 10 << 10) == -6000
+    assert -6000 <= bme280_derived.dew_point(-1500, 1 << 10) < -5900
+    for t in range(-4000, 8501, 500):
+        previous = bme280_derived.DEW_POINT_MIN
+        for rh in range(0, 101):
+            dew = bme280_derived.dew_point(t, rh << 10)
+            assert previous <= dew <= t + 1
+            previous = dew
+    # NWS table values: 90 degF at 70 %RH reads 106, 80 degF at 40 %RH 80
+    assert abs(bme280_derived.heat_index(3222, 70 << 10) - 4128) < 30
+    assert abs(bme280_derived.heat_index(2667, 40 << 10) - 2667) < 30
+    assert bme280_units.centi_degrees(2500, 'F') == 7700
+    assert bme280_units.centi_degrees(2500, 'K') == 29815
+
+
+if __name__ == "__main__":
+    test_derived_quantities()
+    print("derived ok")
@@ -0,0 +1,41 @@
+"""
+bme280_filter on simulated pressure noise.
+Run with pytest or `python test_filter.py`.
+"""
+import bme280_sim
+
+
+def test_software_filters():
+    with bme280_sim.installed() as clock:
+        from array import array
+        import bme280
+        import bme280_filter
+        driver = bme280.BME280(
+            i2c=bme280_sim.SimI2C(bme280_sim.SimulatedBME280(
+                clock=clock, noise=(0.0, 3.0, 0.0), seed=2)),
+            pressure_mode=bme280.OSAMPLE_1, iir=bme280.FILTER_OFF)
+        filters = (bme280_filter.MovingAverage(8, decimation=4),
+                   bme280_filter.Median(5, decimation=4),
+                   bme280_filter.IIR(3, decimation=4))
+        sample = array("i", [0, 0, 0])
+        out = array("i", [0, 0, 0])
+        raw = []
+        smoothed = [[] for _ in filters]
+        for _ in range(200):
+            driver.read_compensated_data(sample)
+            raw.append(sample[1])
+            for f, values in zip(filters, smoothed):
+                if f.update(sample, out):
+                    values.append(out[1])
+
+        def spread(values):
+            values = values[10:]
+            mean = sum(values) / len(values)
+            return (sum((v - mean) ** 2 for v in values) / len(values)) ** 0.5
+        assert all(len(values) == 50 for values in smoothed)
+        assert all(spread(values) < spread(raw) / 1.5 for values in smoothed)
+
+
+if __name__ == "__main__":
+    test_software_filters()
+    print("filter ok")
@@ -0,0 +1,78 @@
+"""
+bme280_group: overlapped conversions and mux selection on bme280_sim.
+Run with pytest or `python test_group.py`.
+"""
+import bme280_sim
+
+
+class MuxI2C(object):
+    """ I2C multiplexer: accesses go to the bus of the selected channel """
+
+    def __init__(self, *buses):
+        self.buses = buses
+        self.channel = 0
+
+    def select(self, channel):
+        self.channel = channel
+
+    def __getattr__(self, name):
+        return getattr(self.buses[self.channel], name)
+
+
+def _cycle_time(clock, group):
+    start = clock.now
+    result = group.read()
+    return clock.now - start, result
+
+
+def test_cycle_time():
+    with bme280_sim.installed() as clock:
+        import bme280
+        import bme280_group
+        times = {}
+        for count in (1, 2, 4):
+            group = bme280_group.BME280Group()
+            for i in range(count):
+                sim = bme280_sim.SimulatedBME280(
+                    clock=clock, environment=bme280_sim.constant(20.0 + i))
+                group.add(bme280.BME280(i2c=bme280_sim.SimI2C(sim)))
+            elapsed, result = _cycle_time(clock, group)
+            times[count] = elapsed
+            assert [round(result[3 * i] / 100) for i in range(count)] == \
+                [20 + i for i in range(count)]
+        # one conversion time per cycle, plus a bus burst per sensor
+        assert 0.038 < times[1] < 0.045
+        assert times[4] - times[1] < 0.002
+
+
+def test_mux_select_order():
+    with bme280_sim.installed() as clock:
+        import bme280
+        import bme280_group
+        sims = [bme280_sim.SimulatedBME280(
+            clock=clock, environment=bme280_sim.constant(t))
+            for t in (18.0, 24.0, 30.0)]
+        mux = MuxI2C(*[bme280_sim.SimI2C(sim) for sim in sims])
+        selected = []
+        group = bme280_group.BME280Group()
+        for channel in range(3):
+            mux.select(channel)
+
+            def select(channel=channel):
+                selected.append(channel)
+                mux.select(channel)
+            group.add(bme280.BME280(i2c=mux), select)
+        for sim in sims:
+            sim.conversions = 0
+        result = group.read()
+        # every trigger first, then each sensor is waited for and read
+        assert selected == [0, 1, 2, 0, 1, 2]
+        assert [sim.conversions for sim in sims] == [1, 1, 1]
+        assert [round(result[3 * i] / 100) for i in range(3)] == \
+            [18, 24, 30]
+
+
+if __name__ == "__main__":
+    test_cycle_time()
+    test_mux_select_order()
+    print("group ok")
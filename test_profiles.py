@@ -0,0 +1,31 @@
+"""
+bme280_profiles: datasheet figures and applying a profile.
+Run with pytest or `python test_profiles.py`.
+"""
+import bme280_sim
+
+
+def test_profiles():
+    with bme280_sim.installed() as clock:
+        import bme280
+        import bme280_profiles
+        # datasheet section 5.5: 25 Hz / 0.9 s and 83 Hz / 0.3 s
+        e = bme280_profiles.estimate(*bme280_profiles.INDOOR_NAVIGATION)
+        assert round(e["odr_hz"]) == 25 and round(e["response_ms"], -2) == 900
+        e = bme280_profiles.estimate(*bme280_profiles.GAMING)
+        assert round(e["odr_hz"]) == 83 and round(e["response_ms"], -2) == 300
+        e = bme280_profiles.estimate(*bme280_profiles.WEATHER)
+        assert e["current_ua"] == 0.16
+        sensor = bme280_sim.SimulatedBME280(clock=clock)
+        i2c = bme280_sim.SimI2C(sensor)
+        driver = bme280.BME280(i2c=i2c)
+        bme280_profiles.apply(driver, bme280_profiles.GAMING)
+        assert sensor.registers[0xF4] == 3 << 5 | 1 << 2 | 3
+        i2c.reset_counters()
+        bme280_profiles.apply(driver, bme280_profiles.GAMING)
+        assert i2c.transactions == 0
+
+
+if __name__ == "__main__":
+    test_profiles()
+    print("profiles ok")
@@ -0,0 +1,36 @@
+"""
+bme280_record: encode and decode a simulated log.
+Run with pytest or `python test_record.py`.
+"""
+import bme280_sim
+
+
+def test_record_round_trip():
+    with bme280_sim.installed() as clock:
+        import bme280
+        import bme280_record
+        driver = bme280.BME280(i2c=bme280_sim.SimI2C(
+            bme280_sim.SimulatedBME280(
+                clock=clock, environment=bme280_sim.sine(21.0, 2.0, 60.0),
+                noise=(0.005, 1.5, 0.05), seed=1)))
+        encoder = bme280_record.Encoder(capacity=64, keyframe_interval=8)
+        log = bytearray()
+        expected = []
+        for _ in range(100):
+            clock.sleep(1.0)
+            if not encoder.read(driver):
+                log += encoder.data()
+                encoder.clear()
+                assert encoder.read(driver)
+            expected.append(tuple(encoder._sample))
+        log += encoder.data()
+        decoded = list(bme280_record.decode(log))
+        assert [d[1:] for d in decoded] == expected
+        steps = [b[0] - a[0] for a, b in zip(decoded, decoded[1:])]
+        assert all(1000 < step < 1100 for step in steps)
+        assert len(log) < 100 * 8
+
+
+if __name__ == "__main__":
+    test_record_round_trip()
+    print("record ok")
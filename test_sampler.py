@@ -0,0 +1,111 @@
+"""
+bme280_sampler: ring buffer and timer driven sampling on bme280_sim.
+Run with pytest or `python test_sampler.py`.
+"""
+from array import array
+import bme280_sim
+import bme280_sampler
+
+
+class StubTimer(object):
+    """ machine.Timer whose callback runs when fire() is called """
+    PERIODIC = 1
+
+    def init(self, period, mode, callback):
+        self.period = period
+        self.callback = callback
+
+    def deinit(self):
+        self.callback = None
+
+    def fire(self):
+        self.callback(self)
+
+
+class Scheduler(object):
+    """ micropython.schedule with a queue of depth entries """
+
+    def __init__(self, depth=4):
+        self.depth = depth
+        self.queue = []
+
+    def __call__(self, function, arg):
+        if len(self.queue) >= self.depth:
+            raise RuntimeError("schedule queue full")
+        self.queue.append((function, arg))
+
+    def run(self):
+        queue, self.queue = self.queue, []
+        for function, arg in queue:
+            function(arg)
+
+
+def test_ring_buffer():
+    size = bme280_sampler.RECORD_SIZE
+    ring = bme280_sampler.RingBuffer(3)
+    for i in range(3):
+        assert ring.push(i, (10 * i, 20 * i, 30 * i))
+    # full: the record is dropped, not overwritten
+    assert not ring.push(3, (0, 0, 0))
+    assert ring.dropped == 1 and len(ring) == 3
+    out = array("i", [0]) * (2 * size + 1)
+    assert ring.drain(out) == 2
+    assert list(out[:2 * size]) == [0, 0, 0, 0, 1, 10, 20, 30]
+    # head wraps past the end of the slots
+    for i in (4, 5):
+        assert ring.push(i, (i, i, i))
+    assert len(ring) == 3
+    out = array("i", [0]) * (8 * size)
+    assert ring.drain(out) == 3
+    assert [out[i * size] for i in range(3)] == [2, 4, 5]
+    assert ring.drain(out) == 0 and len(ring) == 0
+
+
+def test_sampler_timer():
+    scheduler = Scheduler()
+    schedule = bme280_sampler.schedule
+    bme280_sampler.schedule = scheduler
+    try:
+        with bme280_sim.installed() as clock:
+            import bme280
+            driver = bme280.BME280(
+                i2c=bme280_sim.SimI2C(bme280_sim.SimulatedBME280(
+                    clock=clock)),
+                mode=bme280.MODE_NORMAL, standby=bme280.STANDBY_10)
+            sampler = bme280_sampler.Sampler(driver, period_ms=40,
+                                             capacity=4)
+            timer = StubTimer()
+            sampler.start(timer)
+            assert timer.period == 40
+            timer.fire()
+            scheduler.run()
+            assert len(sampler.ring) == 1
+            # a tick while the read is still queued is dropped
+            timer.fire()
+            timer.fire()
+            assert sampler.dropped == 1 and len(scheduler.queue) == 1
+            scheduler.run()
+            # so is one the schedule queue refuses, without wedging _pending
+            scheduler.depth = 0
+            timer.fire()
+            assert sampler.dropped == 2
+            scheduler.depth = 4
+            for _ in range(3):
+                clock.sleep(0.04)
+                timer.fire()
+                scheduler.run()
+            assert len(sampler.ring) == 4 and sampler.dropped == 3
+            out = array("i", [0]) * (3 * bme280_sampler.RECORD_SIZE)
+            assert sampler.drain(out) == 3
+            assert all(abs(out[i + 1] - 2100) <= 1 for i in (0, 4, 8))
+            assert sampler.drain(out) == 1
+            sampler.stop()
+            assert timer.callback is None
+    finally:
+        bme280_sampler.schedule = schedule
+
+
+if __name__ == "__main__":
+    test_ring_buffer()
+    test_sampler_timer()
+    print("sampler ok")
@@ -0,0 +1,71 @@
+"""
+Checks the bme280_sim register model and runs every driver variant against
+it under CPython.
+Run with pytest or `python test_sim.py`.
+"""
+import bme280_sim
+
+VARIANTS = ("bme280", "bme280_lowmem", "bme280_microbit",
+            "bme280_microbit_lowmem")
+
+
+def test_variants_read_environment():
+    with bme280_sim.installed() as clock:
+        for name in VARIANTS:
+            sensor = bme280_sim.SimulatedBME280(
+                clock=clock,
+                environment=bme280_sim.constant(23.5, 98000.0, 55.0))
+            i2c = bme280_sim.SimI2C(sensor)
+            driver = bme280_sim.driver(name, i2c)
+            temp, pres, humi = driver.read_compensated_data()
+            assert abs(temp - 2350) <= 1, (name, temp)
+            assert abs(pres - 98000 * 256) <= 256, (name, pres)
+            assert abs(humi - 55 * 1024) <= 16, (name, humi)
+            assert sensor.conversions == 1, name
+
+
+def test_forced_conversion_timing():
+    clock = bme280_sim.VirtualClock()
+    sensor = bme280_sim.SimulatedBME280(clock=clock)
+    sensor.write(0xF2, b'\x01')
+    sensor.write(0xF4, bytes([5 << 5 | 2 << 2 | 1]))
+    assert sensor.measuring
+    clock.sleep(0.039)
+    assert sensor.measuring
+    clock.sleep(0.002)
+    assert not sensor.measuring
+    assert sensor.read(0xF4, 1)[0] & 0x03 == 0
+
+
+def test_ctrl_hum_latched_by_ctrl_meas():
+    clock = bme280_sim.VirtualClock()
+    sensor = bme280_sim.SimulatedBME280(clock=clock)
+    sensor.write(0xF2, b'\x00')
+    sensor.write(0xF4, bytes([1 << 5 | 1 << 2 | 1]))
+    clock.sleep(0.1)
+    sensor.write(0xF2, b'\x01')
+    assert sensor.read(0xFD, 2) == b'\x80\x00'
+    sensor.write(0xF4, bytes([1 << 5 | 1 << 2 | 1]))
+    clock.sleep(0.1)
+    assert sensor.read(0xFD, 2) != b'\x80\x00'
+
+
+def test_normal_mode_and_config_lock():
+    clock = bme280_sim.VirtualClock()
+    sensor = bme280_sim.SimulatedBME280(clock=clock)
+    sensor.write(0xF5, bytes([1 << 5]))
+    sensor.write(0xF4, bytes([1 << 5 | 1 << 2 | 3]))
+    sensor.write(0xF5, bytes([0]))
+    assert sensor.read(0xF5, 1)[0] == 1 << 5
+    clock.sleep(1.0)
+    sensor.read(0xF3, 1)
+    # 5.5 ms measurement plus 62.5 ms standby per cycle
+    assert sensor.conversions == 15
+
+
+if __name__ == "__main__":
+    test_variants_read_environment()
+    test_forced_conversion_timing()
+    test_ctrl_hum_latched_by_ctrl_meas()
+    test_normal_mode_and_config_lock()
+    print("simulator ok")
@@ -0,0 +1,28 @@
+"""
+bme280_stats against bme280_sim.
+Run with pytest or `python test_stats.py`.
+"""
+import bme280_sim
+
+
+def test_stats_phases():
+    with bme280_sim.installed() as clock:
+        import bme280
+        driver = bme280.BME280(
+            i2c=bme280_sim.SimI2C(bme280_sim.SimulatedBME280(clock=clock)))
+        stats = driver.enable_stats()
+        for _ in range(10):
+            driver.read_compensated_data()
+        counts = stats.snapshot(reset=True)
+        assert counts["reads"] == counts["bursts"] == 10
+        assert counts["triggers"] == counts["waits"] == 10
+        assert counts["bus_reads"] == 20 + counts["polls"]
+        assert counts["sleep_us"] + counts["poll_us"] <= counts["read_us"]
+        assert stats.snapshot()["reads"] == 0
+        driver.enable_stats(False)
+        assert "read_raw_data" not in driver.__dict__
+
+
+if __name__ == "__main__":
+    test_stats_phases()
+    print("stats ok")